@@ -0,0 +1,204 @@
+import hashlib, math, os, time
+from threading import Lock, Thread
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect, or_, select
+from sqlalchemy.orm import Session, object_session
+from models import db, User
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for p in self._positions(key):
+            self._bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def expected_error_rate(self):
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+# A miss is answered from memory without touching the database. Writes made
+# by this process are added after they commit; signups on other workers are
+# picked up by an id-range sync in the background every refresh interval, and
+# the periodic rebuild also catches changed emails. A stale "no" only costs a
+# login attempt: uniqueness itself is enforced by the database on insert.
+class IdentityFilter:
+    def __init__(self, app, capacity=100000, error_rate=0.01, refresh=60, rebuild=900, batch_size=5000):
+        self.app = app
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh
+        self.rebuild_interval = rebuild
+        self.batch_size = batch_size
+        self._lock = Lock()
+        self._bloom = None
+        self._last_id = 0
+        self._built_at = 0.0
+        self._synced_at = 0.0
+        self._background = None
+        self.misses = 0
+        self.passes = 0
+
+    def _rows(self, session, after_id):
+        return session.execute(
+            select(User.id, User.username, User.mobile_number)
+            .where(User.id > after_id)
+            .order_by(User.id)
+            .execution_options(yield_per=self.batch_size)
+        )
+
+    def build(self, session):
+        total = session.query(func.count(User.id)).scalar() or 0
+        bloom = BloomFilter(max(self.capacity, 2 * total), self.error_rate)
+        last_id = 0
+        for user_id, email, mobile in self._rows(session, 0):
+            self._add(bloom, email, mobile)
+            last_id = user_id
+        now = time.monotonic()
+        with self._lock:
+            self._bloom = bloom
+            self._last_id = last_id
+            self._built_at = self._synced_at = now
+
+    def sync(self, session):
+        with self._lock:
+            bloom, last_id = self._bloom, self._last_id
+        for user_id, email, mobile in self._rows(session, last_id):
+            self._add(bloom, email, mobile)
+            last_id = user_id
+        with self._lock:
+            self._last_id = max(self._last_id, last_id)
+            self._synced_at = time.monotonic()
+
+    def _in_background(self, work):
+        def run():
+            try:
+                with self.app.app_context():
+                    work(db.session)
+            except Exception:
+                self.app.logger.exception('Identity filter refresh failed')
+            finally:
+                self._background = None
+
+        with self._lock:
+            if self._background == os.getpid():
+                return
+            self._background = os.getpid()
+        Thread(target=run, name='identity-filter', daemon=True).start()
+
+    @staticmethod
+    def _add(bloom, email, mobile):
+        if email:
+            bloom.add('email:' + email.lower())
+        if mobile:
+            bloom.add('mobile:' + mobile)
+
+    def add(self, email=None, mobile=None):
+        bloom = self._bloom
+        if bloom is not None:
+            with self._lock:
+                self._add(bloom, email, mobile)
+
+    def _contains(self, key):
+        now = time.monotonic()
+        if self._bloom is None or now - self._built_at > self.rebuild_interval:
+            self._in_background(self.build)
+        elif now - self._synced_at > self.refresh_interval:
+            self._in_background(self.sync)
+
+        # Until the first build finishes every lookup goes to the database.
+        bloom = self._bloom
+        if bloom is None or key in bloom:
+            self.passes += 1
+            return True
+        self.misses += 1
+        return False
+
+    def might_have_email(self, email):
+        return self._contains('email:' + email.lower())
+
+    def might_have_mobile(self, mobile):
+        return self._contains('mobile:' + mobile)
+
+    def stats(self):
+        bloom = self._bloom
+        lookups = self.misses + self.passes
+        return {
+            'entries': bloom.count if bloom else 0,
+            'bits': bloom.size if bloom else 0,
+            'hashes': bloom.hashes if bloom else 0,
+            'expected_error_rate': bloom.expected_error_rate() if bloom else 0.0,
+            'definite_misses': self.misses,
+            'passed_to_db': self.passes,
+            'miss_ratio': self.misses / lookups if lookups else 0.0,
+        }
+
+
+def uniqueness_conflict(session, email, mobile, exclude_id=None):
+    query = select(User.username, User.mobile_number).where(
+        or_(User.username == email, User.mobile_number == mobile)
+    )
+    if exclude_id is not None:
+        query = query.where(User.id != exclude_id)
+    rows = session.execute(query.limit(2)).all()
+    if any(row.username == email for row in rows):
+        return 'email'
+    if rows:
+        return 'mobile'
+    return None
+
+
+def _record(target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('identity_keys', []).append((target.username, target.mobile_number))
+
+
+@event.listens_for(User, 'after_insert')
+def _user_inserted(mapper, connection, target):
+    _record(target)
+
+
+@event.listens_for(User, 'after_update')
+def _user_updated(mapper, connection, target):
+    # Logins update lat/lon on every visit; only email or mobile changes matter.
+    state = inspect(target)
+    if state.attrs.username.history.has_changes() or state.attrs.mobile_number.history.has_changes():
+        _record(target)
+
+
+# Added only once committed, so a rolled-back signup never reads as taken.
+# Savepoints fire these events too; only the outer transaction counts.
+@event.listens_for(Session, 'after_commit')
+def _add_committed(session):
+    if session.in_nested_transaction():
+        return
+    keys = session.info.pop('identity_keys', None)
+    if keys and has_app_context() and 'identity_filter' in current_app.extensions:
+        identity_filter = current_app.extensions['identity_filter']
+        for email, mobile in keys:
+            identity_filter.add(email, mobile)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    if session.in_nested_transaction():
+        return
+    session.info.pop('identity_keys', None)
@@ -0,0 +1,157 @@
+import gzip, hashlib, json, mimetypes, os, re, shutil, time
+from flask import url_for
+from jinja2 import FileSystemBytecodeCache
+
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html')
+# Preferred first: brotli is smaller than gzip for text at comparable decode cost.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+MAX_AGE = 365 * 24 * 3600
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def compress(data):
+    encoded = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    brotli = _brotli()
+    if brotli:
+        encoded['br'] = brotli.compress(data, quality=11)
+    return {encoding: packed for encoding, packed in encoded.items() if len(packed) < len(data)}
+
+
+def build(static_dir):
+    # Content-hashed names never change meaning, so they can be cached forever;
+    # editing a file yields a new name and the manifest points templates at it.
+    # Earlier builds are left in place for cached pages that still link to them.
+    out_dir = os.path.join(static_dir, DIST)
+    os.makedirs(out_dir, exist_ok=True)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != out_dir)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            stem, ext = os.path.splitext(logical)
+            target = f'{stem}.{fingerprint(source)}{ext}'
+            destination = os.path.join(out_dir, target)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copyfile(source, destination)
+            if ext in COMPRESSIBLE:
+                with open(source, 'rb') as f:
+                    for encoding, packed in compress(f.read()).items():
+                        with open(destination + dict(ENCODINGS)[encoding], 'wb') as out:
+                            out.write(packed)
+            manifest[logical] = f'{DIST}/{target}'
+
+    with open(os.path.join(out_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class Assets:
+    def __init__(self, static_dir):
+        self.dist_dir = os.path.join(static_dir, DIST)
+        self.manifest = {}
+        self.reload()
+
+    def reload(self):
+        path = os.path.join(self.dist_dir, MANIFEST)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+
+    def url(self, logical):
+        # Without a build the plain file is served, so development needs no extra step.
+        return url_for('static', filename=self.manifest.get(logical, logical))
+
+    def variant(self, filename, accept_encodings):
+        # Returns (file to send, Content-Encoding or None, mimetype of the original).
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        for encoding, suffix in ENCODINGS:
+            if accept_encodings[encoding] and os.path.isfile(os.path.join(self.dist_dir, filename + suffix)):
+                return filename + suffix, encoding, mimetype
+        return filename, None, mimetype
+
+
+def configure_templates(app):
+    # Must run before anything touches app.jinja_env, which is created once
+    # from jinja_options. Each worker then loads compiled templates from disk
+    # instead of parsing and compiling them on first render. An empty
+    # JINJA_BYTECODE_CACHE_DIR turns the cache off.
+    cache_dir = app.config['JINJA_BYTECODE_CACHE_DIR']
+    if cache_dir == '':
+        return
+    cache_dir = cache_dir or os.path.join(app.instance_path, 'jinja-cache')
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_options = {**app.jinja_options, 'bytecode_cache': FileSystemBytecodeCache(cache_dir)}
+
+
+def _asset_refs(html):
+    return sorted(set(re.findall(r'(?:src|href)="(/static/[^"]+)"', html)))
+
+
+def _response_size(client, url, accept_encoding):
+    response = client.get(url, headers={'Accept-Encoding': accept_encoding})
+    size = len(response.get_data())
+    response.close()
+    return size
+
+
+def page_bytes(client, url):
+    response = client.get(url)
+    html = response.get_data()
+    raw = served = 0
+    for ref in _asset_refs(html.decode('utf-8', 'replace')):
+        raw += _response_size(client, ref, 'identity')
+        served += _response_size(client, ref, 'br, gzip')
+    html_gzip = len(gzip.compress(html, compresslevel=6))
+    return {
+        'status': response.status_code,
+        'html_bytes': len(html),
+        'html_gzip_bytes': html_gzip,
+        'asset_bytes': raw,
+        'asset_served_bytes': served,
+        'first_visit_bytes': html_gzip + served,
+        # Fingerprinted assets are immutable, so a repeat visit only fetches the page.
+        'repeat_visit_bytes': html_gzip,
+    }
+
+
+def compile_times(env, names, runs=20):
+    cold = env.overlay(cache_size=0, bytecode_cache=None)
+    results = {}
+    for name in names:
+        started = time.perf_counter()
+        for _ in range(runs):
+            cold.get_template(name)
+        cold_ms = (time.perf_counter() - started) / runs * 1000
+
+        warm_ms = None
+        if env.bytecode_cache is not None:
+            warm = env.overlay(cache_size=0)
+            warm.get_template(name)
+            started = time.perf_counter()
+            for _ in range(runs):
+                warm.get_template(name)
+            warm_ms = (time.perf_counter() - started) / runs * 1000
+        results[name] = {'compile_ms': cold_ms, 'bytecode_cache_ms': warm_ms}
+    return results
@@ -0,0 +1,185 @@
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from threading import Lock
+from zoneinfo import ZoneInfo
+from sqlalchemy import and_, event, or_, update
+from models import Appointment, GadgetType, ServiceProvider
+
+
+SLOT_MINUTES = 60
+OPEN_HOUR = 9
+CLOSE_HOUR = 19
+TIMEZONE = 'Asia/Kolkata'
+SCHEDULE_TTL = 30
+REGISTRY_MISS_RELOAD = 5
+
+RESCHEDULED_STATUSES = ('Rescheduled', 'Pending_Rescheduled')
+BOOKED_STATUSES = ('New', 'Pending') + RESCHEDULED_STATUSES
+
+
+def booked_time(status, preferred_time, reschedule_time):
+    if status in RESCHEDULED_STATUSES and reschedule_time:
+        return reschedule_time
+    return preferred_time
+
+
+class GadgetRegistry:
+    def __init__(self, miss_reload=REGISTRY_MISS_RELOAD):
+        self.miss_reload = miss_reload
+        self._lock = Lock()
+        self._ids = None
+        self._loaded_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._ids = None
+
+    def load(self, session):
+        ids = {name.lower(): gadget_id for gadget_id, name in session.query(GadgetType.id, GadgetType.name)}
+        with self._lock:
+            self._ids = ids
+            self._loaded_at = time.monotonic()
+        return ids
+
+    def get(self, session, name):
+        key = (name or '').strip().lower()
+        ids = self._ids
+        if ids is None:
+            ids = self.load(session)
+        gadget_id = ids.get(key)
+        # A gadget type added by another process shows up as a miss; reload,
+        # but not so often that junk input turns into a query per request.
+        if gadget_id is None and time.monotonic() - self._loaded_at > self.miss_reload:
+            gadget_id = self.load(session).get(key)
+        return gadget_id
+
+
+class AvailabilityEngine:
+    def __init__(self, slot_minutes=SLOT_MINUTES, open_hour=OPEN_HOUR, close_hour=CLOSE_HOUR, ttl=SCHEDULE_TTL,
+                 timezone=TIMEZONE):
+        self.slot = timedelta(minutes=slot_minutes)
+        self.open_hour = open_hour
+        self.close_hour = close_hour
+        self.timezone = ZoneInfo(timezone)
+        self.ttl = ttl
+        self._lock = Lock()
+        self._schedules = {}
+
+    def configure(self, slot_minutes, open_hour, close_hour, timezone=TIMEZONE):
+        with self._lock:
+            self.slot = timedelta(minutes=slot_minutes)
+            self.open_hour = open_hour
+            self.close_hour = close_hour
+            self.timezone = ZoneInfo(timezone)
+            self._schedules.clear()
+
+    def now(self):
+        # Booking times come from the form as naive wall-clock times in the
+        # shop's timezone and are stored that way, so "now" and the opening
+        # hours are compared in that clock too.
+        return datetime.now(self.timezone).replace(tzinfo=None)
+
+    def invalidate(self, provider_id=None):
+        with self._lock:
+            if provider_id is None:
+                self._schedules.clear()
+            else:
+                self._schedules.pop(provider_id, None)
+
+    def _booked_rows(self, session, provider_id, start, end):
+        return session.query(
+            Appointment.status,
+            Appointment.preferred_time,
+            Appointment.reschedule_time
+        ).filter(
+            Appointment.provider_id == provider_id,
+            Appointment.status.in_(BOOKED_STATUSES),
+            or_(
+                and_(Appointment.preferred_time > start, Appointment.preferred_time < end),
+                and_(Appointment.reschedule_time > start, Appointment.reschedule_time < end)
+            )
+        ).all()
+
+    def load(self, session, provider_id, now=None):
+        now = now or self.now()
+        starts = sorted(
+            t for t in (booked_time(*row) for row in self._booked_rows(session, provider_id, now - self.slot, datetime.max))
+            if t is not None and t > now - self.slot
+        )
+        with self._lock:
+            self._schedules[provider_id] = (time.monotonic(), starts)
+        return starts
+
+    def schedule(self, session, provider_id):
+        entry = self._schedules.get(provider_id)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return self.load(session, provider_id)
+        return entry[1]
+
+    def _overlaps(self, starts, start):
+        i = bisect_left(starts, start)
+        if i < len(starts) and starts[i] - start < self.slot:
+            return True
+        return i > 0 and start - starts[i - 1] < self.slot
+
+    def is_free(self, session, provider_id, start):
+        return not self._overlaps(self.schedule(session, provider_id), start)
+
+    def _open_slots(self, after):
+        day = after.replace(hour=0, minute=0, second=0, microsecond=0)
+        while True:
+            t = day + timedelta(hours=self.open_hour)
+            close = day + timedelta(hours=self.close_hour)
+            while t + self.slot <= close:
+                if t >= after:
+                    yield t
+                t += self.slot
+            day += timedelta(days=1)
+
+    def next_free(self, session, provider_id, after=None, count=5, horizon_days=30):
+        after = after or self.now()
+        starts = self.schedule(session, provider_id)
+        limit = after + timedelta(days=horizon_days)
+        free = []
+        for t in self._open_slots(after):
+            if t > limit or len(free) >= count:
+                break
+            if not self._overlaps(starts, t):
+                free.append(t)
+        return free
+
+    def lock_provider(self, session, provider_id):
+        # A no-op UPDATE takes the provider's row lock on Postgres and the
+        # write lock on SQLite, so concurrent bookings for one provider queue
+        # up behind each other instead of both passing the conflict check.
+        session.execute(
+            update(ServiceProvider)
+            .where(ServiceProvider.id == provider_id)
+            .values(id=ServiceProvider.id)
+        )
+
+    def conflicts(self, session, provider_id, start):
+        rows = self._booked_rows(session, provider_id, start - self.slot, start + self.slot)
+        return any(
+            t is not None and abs(t - start) < self.slot
+            for t in (booked_time(*row) for row in rows)
+        )
+
+
+gadget_types = GadgetRegistry()
+availability = AvailabilityEngine()
+
+
+@event.listens_for(GadgetType, 'after_insert')
+@event.listens_for(GadgetType, 'after_update')
+@event.listens_for(GadgetType, 'after_delete')
+def _invalidate_gadget_types(mapper, connection, target):
+    gadget_types.invalidate()
+
+
+@event.listens_for(Appointment, 'after_insert')
+@event.listens_for(Appointment, 'after_update')
+@event.listens_for(Appointment, 'after_delete')
+def _invalidate_schedule(mapper, connection, target):
+    availability.invalidate(target.provider_id)
@@ -0,0 +1,390 @@
+import click
+import json, os, subprocess, sys, tempfile, time
+from datetime import datetime
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import create_engine, inspect
+from models import db, ServiceProvider
+from extensions import invoice_store, page_cache
+from events import outbox_handlers
+from coupons import CodePermutation, generate_key as generate_coupon_key, benchmark as benchmark_coupons, expire_coupons
+from outbox import DISPATCH_GRACE, dispatch_pending as dispatch_pending_outbox
+from geo import backfill_geohash
+from indexes import ensure_indexes, check_query_plans, upgrade as upgrade_schema
+from invoices import load_invoice_appointment, benchmark as benchmark_invoices
+from ratings import find_drift, repair as repair_ratings
+from search import rebuild as rebuild_search
+from rollups import backfill as backfill_rollups
+from export import FORMATS as EXPORT_FORMATS, encode as encode_export, iter_rows as export_rows, parse_date
+import assets
+import loadtest
+
+
+@click.command('coupons-key')
+@with_appcontext
+def coupons_key_command():
+    print(generate_coupon_key())
+
+
+@click.command('coupons-bench')
+@click.option('--count', default=1000000, help='Number of codes to generate.')
+@with_appcontext
+def coupons_bench_command(count):
+    result = benchmark_coupons(CodePermutation(generate_coupon_key()), count)
+    print(f"{result['codes']} codes in {result['seconds']:.2f}s "
+          f"({result['codes_per_second']:.0f} codes/s), "
+          f"{result['collisions']} collisions ({result['collision_rate']:.2e})")
+
+
+@click.command('coupons-expire')
+@click.option('--batch-size', default=1000, help='Coupons updated per transaction.')
+@click.option('--pause', default=0.0, help='Seconds to sleep between batches.')
+@click.option('--interval', default=0, help='Keep running, sweeping every N seconds.')
+@with_appcontext
+def coupons_expire_command(batch_size, pause, interval):
+    while True:
+        expired = expire_coupons(db.session, batch_size=batch_size, pause=pause)
+        print(f"Expired {expired} coupons")
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+@click.command('outbox-dispatch')
+@click.option('--grace', default=DISPATCH_GRACE, help='Skip events younger than N seconds; workers may still be recording them.')
+@with_appcontext
+def outbox_dispatch_command(grace):
+    dispatched = dispatch_pending_outbox(db.session, outbox_handlers, grace=grace, logger=current_app.logger)
+    print(f"Dispatched {dispatched} outbox events")
+
+
+@click.command('geohash-backfill')
+@click.option('--interval', default=0, help='Keep running, backfilling every N seconds.')
+@with_appcontext
+def geohash_backfill_command(interval):
+    while True:
+        updated = backfill_geohash(db.session)
+        print(f"Updated geohash for {updated} providers")
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+@click.command('db-indexes')
+@with_appcontext
+def db_indexes_command():
+    created = ensure_indexes(db.engine)
+    for name in created:
+        print(f"Created index {name}")
+    print(f"{len(created)} indexes created")
+
+
+@click.command('db-upgrade')
+@with_appcontext
+def db_upgrade_command():
+    result = upgrade_schema(db.engine)
+    for name in result['tables']:
+        print(f"Created table {name}")
+    for name in result['columns']:
+        print(f"Added column {name}")
+    for name in result['indexes']:
+        print(f"Created index {name}")
+
+    # Columns and tables derived from existing rows start out empty.
+    if 'service_provider.geohash' in result['columns']:
+        print(f"Updated geohash for {backfill_geohash(db.session)} providers")
+    if 'service_provider.rating_sum' in result['columns']:
+        print(f"Recomputed ratings for {repair_ratings(db.session)} providers")
+    if 'provider_search' in result['tables']:
+        print(f"Rebuilt search documents for {rebuild_search(db.session)} providers")
+        page_cache.invalidate_listings()
+    if 'daily_stats' in result['tables']:
+        print("daily_stats is empty; fill past days with `flask rollups-backfill --start YYYY-MM-DD`")
+
+
+@click.command('db-check-plans')
+@with_appcontext
+def db_check_plans_command():
+    failed = 0
+    for name, (uses_index, plan) in check_query_plans(db.engine).items():
+        print(f"{'ok  ' if uses_index else 'SCAN'} {name}")
+        for line in plan:
+            print(f"       {line}")
+        failed += not uses_index
+    if failed:
+        raise click.ClickException(f"{failed} hot queries fall back to a sequential scan")
+
+
+@click.command('ratings-check')
+@with_appcontext
+def ratings_check_command():
+    drift = find_drift(db.session)
+    for d in drift:
+        print(f"Provider {d['provider_id']}: stored {d['stored']}, actual {d['actual']}")
+    print(f"{len(drift)} providers with rating drift")
+
+
+@click.command('ratings-repair')
+@click.option('--all', 'repair_all', is_flag=True, help='Recompute every provider instead of only drifted ones.')
+@with_appcontext
+def ratings_repair_command(repair_all):
+    provider_ids = [p.id for p in ServiceProvider.query.with_entities(ServiceProvider.id)] if repair_all else None
+    repaired = repair_ratings(db.session, provider_ids)
+    print(f"Recomputed ratings for {repaired} providers")
+
+
+@click.command('invoices-regenerate')
+@click.option('--force', is_flag=True, help='Re-render invoices that are already cached.')
+@with_appcontext
+def invoices_regenerate_command(force):
+    generated = invoice_store.regenerate_all(force=force)
+    print(f"Processed {generated} invoices into {invoice_store.cache_dir}")
+
+
+@click.command('invoices-bench')
+@click.argument('appointment_id', type=int)
+@click.option('--rounds', default=10, help='Renders per backend.')
+@with_appcontext
+def invoices_bench_command(appointment_id, rounds):
+    appointment = load_invoice_appointment(appointment_id)
+    if not appointment:
+        raise click.ClickException('Appointment not found')
+    for name, result in benchmark_invoices(appointment, rounds).items():
+        print(name, result)
+
+
+STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+heavy = ['xhtml2pdf', 'reportlab', 'weasyprint', 'cloudinary', 'requests']
+print(json.dumps({'seconds': elapsed, 'modules': len(sys.modules), 'loaded': [m for m in heavy if m in sys.modules]}))
+"""
+
+
+def measure_startup(runs=5):
+    root = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        process = subprocess.Popen([sys.executable, '-c', STARTUP_PROBE], cwd=root, stdout=subprocess.PIPE)
+        output = process.stdout.read()
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = status
+        if status:
+            raise click.ClickException('Startup probe failed')
+        sample = json.loads(output)
+        sample['max_rss_kb'] = usage.ru_maxrss
+        samples.append(sample)
+
+    seconds = sorted(s['seconds'] for s in samples)
+    return {
+        'runs': runs,
+        'import_seconds_p50': seconds[runs // 2],
+        'import_seconds_max': seconds[-1],
+        'max_rss_kb': max(s['max_rss_kb'] for s in samples),
+        'modules': samples[-1]['modules'],
+        'heavy_modules_loaded': samples[-1]['loaded'],
+    }
+
+
+@click.command('search-rebuild')
+@click.option('--batch-size', default=500, help='Providers refreshed per transaction.')
+@click.option('--interval', default=0, help='Keep running, rebuilding every N seconds.')
+@with_appcontext
+def search_rebuild_command(batch_size, interval):
+    while True:
+        rebuilt = rebuild_search(db.session, batch_size=batch_size)
+        page_cache.invalidate_listings()
+        print(f"Rebuilt search documents for {rebuilt} providers")
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+@click.command('export-appointments')
+@click.option('--format', 'fmt', type=click.Choice(list(EXPORT_FORMATS)), default='csv')
+@click.option('--output', type=click.File('w'), default='-', help='File to write, stdout by default.')
+@click.option('--start', help='Created on or after this date (YYYY-MM-DD).')
+@click.option('--end', help='Created before this date (YYYY-MM-DD).')
+@click.option('--status', 'statuses', multiple=True, help='Only these statuses; repeatable.')
+@click.option('--after-id', default=0, help='Resume after this appointment id.')
+@click.option('--batch-size', default=5000, help='Rows per keyset page.')
+@with_appcontext
+def export_appointments_command(fmt, output, start, end, statuses, after_id, batch_size):
+    rows = export_rows(db.session, parse_date(start), parse_date(end), statuses, after_id, batch_size)
+    for line in encode_export(rows, fmt, header=not after_id):
+        output.write(line)
+
+
+@click.command('rollups-backfill')
+@click.option('--start', required=True, help='First day to rebuild (YYYY-MM-DD).')
+@click.option('--end', help='Day after the last one to rebuild (YYYY-MM-DD). Defaults to today.')
+@with_appcontext
+def rollups_backfill_command(start, end):
+    end = parse_date(end).date() if end else datetime.utcnow().date()
+    rebuilt = backfill_rollups(db.session, parse_date(start).date(), end)
+    print(f"Rebuilt {rebuilt} daily rollup rows")
+
+
+@click.command('cache-invalidate')
+@click.option('--provider', 'provider_ids', type=int, multiple=True, help='Provider whose pages changed.')
+@with_appcontext
+def cache_invalidate_command(provider_ids):
+    for provider_id in provider_ids:
+        page_cache.invalidate_provider(provider_id)
+    page_cache.invalidate_listings()
+    print(f"Invalidated provider listings and {len(provider_ids)} provider pages")
+
+
+@click.command('assets-build')
+@with_appcontext
+def assets_build_command():
+    manifest = assets.build(current_app.static_folder)
+    current_app.extensions['assets'].reload()
+    print(f"Fingerprinted {len(manifest)} static files into {os.path.join(current_app.static_folder, assets.DIST)}")
+
+
+@click.command('bench-assets')
+@click.option('--runs', default=20, help='Template loads to average per template.')
+@click.option('--output', type=click.Path(), help='Write the result as JSON to this file.')
+def bench_assets_command(runs, output):
+    from app import create_app
+
+    workdir = tempfile.mkdtemp(prefix='bench-assets-')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(workdir, 'bench.db'),
+        'INVOICE_CACHE_DIR': os.path.join(workdir, 'invoices'),
+        'JINJA_BYTECODE_CACHE_DIR': os.path.join(workdir, 'jinja-cache'),
+    })
+    app.logger.setLevel('ERROR')
+    with app.app_context():
+        db.create_all()
+        loadtest.seed(db.session, users=5, providers=20, appointments=20, coupons=5)
+        db.session.remove()
+
+    anonymous = app.test_client()
+    signed_in = app.test_client()
+    with signed_in.session_transaction() as s:
+        s['_user_id'] = '1'
+        s['lat'] = str(loadtest.CENTER[0])
+        s['lon'] = str(loadtest.CENTER[1])
+    pages = [(anonymous, url) for url in ('/', '/login_form', '/signup', '/support')] + \
+            [(signed_in, url) for url in ('/profile', '/providers?gadget=mobile', '/provider/1')]
+
+    result = {'templates': assets.compile_times(app.jinja_env, app.jinja_env.list_templates(), runs), 'pages': {}}
+    # Plain /static files first, then the fingerprinted, precompressed build.
+    app.extensions['assets'].manifest = {}
+    result['pages']['plain'] = {url: assets.page_bytes(client, url) for client, url in pages}
+    assets.build(app.static_folder)
+    app.extensions['assets'].reload()
+    app.extensions['page_cache'].backend.clear()
+    result['pages']['built'] = {url: assets.page_bytes(client, url) for client, url in pages}
+
+    print(f"{'template':<24} {'compile ms':>11} {'cached ms':>10}")
+    for name, stats in result['templates'].items():
+        print(f"{name:<24} {stats['compile_ms']:>11.2f} {stats['bytecode_cache_ms']:>10.2f}")
+    print(f"{'page':<26} {'build':<8} {'html':>8} {'html gz':>8} {'assets':>8} {'served':>8} {'first':>8} {'repeat':>8}")
+    for label, pages_result in result['pages'].items():
+        for url, stats in pages_result.items():
+            print(f"{url:<26} {label:<8} {stats['html_bytes']:>8} {stats['html_gzip_bytes']:>8} "
+                  f"{stats['asset_bytes']:>8} {stats['asset_served_bytes']:>8} "
+                  f"{stats['first_visit_bytes']:>8} {stats['repeat_visit_bytes']:>8}")
+    if output:
+        with open(output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+@click.command('bench-startup')
+@click.option('--runs', default=5, help='Fresh interpreter starts to sample.')
+@click.option('--output', type=click.Path(), help='Write the result as JSON to this file.')
+def bench_startup_command(runs, output):
+    result = measure_startup(runs)
+    if output:
+        with open(output, 'w') as f:
+            json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+
+@click.command('bench-load')
+@click.option('--database', help='Database URL to seed. Defaults to a fresh SQLite file.')
+@click.option('--users', default=200)
+@click.option('--providers', default=500)
+@click.option('--appointments', default=5000)
+@click.option('--coupons', default=1000)
+@click.option('--concurrency', default=8, help='Concurrent test clients, one user each.')
+@click.option('--requests', 'requests_', default=200, help='Timed requests per scenario.')
+@click.option('--scenario', 'scenarios', multiple=True, type=click.Choice(loadtest.SCENARIOS))
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False),
+              help='Fail if results regress against this JSON file, written by an earlier run with --output.')
+@click.option('--tolerance', default=0.25, help='Allowed latency/throughput slack against the baseline.')
+@click.option('--output', type=click.Path(), help='Write the results as JSON to this file.')
+@click.option('--force', is_flag=True, help='Drop and reseed --database even if it already has tables.')
+def bench_load_command(database, users, providers, appointments, coupons, concurrency, requests_,
+                       scenarios, baseline, tolerance, output, force):
+    from app import create_app
+
+    if not database:
+        database = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench-'), 'bench.db')
+    elif not force:
+        engine = create_engine(database)
+        tables = inspect(engine).get_table_names()
+        engine.dispose()
+        if tables:
+            raise click.UsageError(f'{database} already has tables; bench-load drops them. Pass --force to allow it.')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database,
+        'INVOICE_CACHE_DIR': tempfile.mkdtemp(prefix='bench-invoices-'),
+    })
+    app.logger.setLevel('ERROR')
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        dataset = loadtest.seed(db.session, users, providers, appointments, coupons)
+        db.session.remove()
+
+    result = loadtest.run(app, dataset, scenarios or loadtest.SCENARIOS, concurrency, requests_)
+
+    print(f"{'scenario':<20} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7}")
+    for name, stats in result['scenarios'].items():
+        print(f"{name:<20} {stats['requests_per_second']:>8.1f} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} "
+              f"{stats['p99_ms']:>8.2f} {stats['queries_per_request']:>8.1f} {stats['errors']:>7}")
+
+    if output:
+        loadtest.save_baseline(output, result)
+    if baseline:
+        regressions = loadtest.compare(loadtest.load_baseline(baseline), result, tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+COMMANDS = [
+    coupons_key_command,
+    coupons_bench_command,
+    coupons_expire_command,
+    outbox_dispatch_command,
+    geohash_backfill_command,
+    db_indexes_command,
+    db_upgrade_command,
+    db_check_plans_command,
+    ratings_check_command,
+    ratings_repair_command,
+    invoices_regenerate_command,
+    invoices_bench_command,
+    search_rebuild_command,
+    cache_invalidate_command,
+    assets_build_command,
+    export_appointments_command,
+    rollups_backfill_command,
+    bench_startup_command,
+    bench_load_command,
+    bench_assets_command,
+]
+
+
+def init_app(app):
+    for command in COMMANDS:
+        app.cli.add_command(command)
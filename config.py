@@ -0,0 +1,89 @@
+import os
+
+
+def pool_size():
+    # Each gunicorn worker owns a pool, so a server-wide connection budget is
+    # split across WEB_CONCURRENCY workers, leaving room for the overflow.
+    if os.getenv('DB_POOL_SIZE'):
+        return int(os.getenv('DB_POOL_SIZE'))
+    if os.getenv('DB_MAX_CONNECTIONS'):
+        workers = int(os.getenv('WEB_CONCURRENCY', 1))
+        overflow = int(os.getenv('DB_MAX_OVERFLOW', 5))
+        return max(1, int(os.getenv('DB_MAX_CONNECTIONS')) // workers - overflow)
+    return 5
+
+
+def from_env():
+    return {
+        'SECRET_KEY': os.getenv('secret_key'),
+        'SQLALCHEMY_DATABASE_URI': os.getenv('url_db'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'SQLALCHEMY_REPLICA_URI': os.getenv('url_db_replica'),
+        'DB_POOL_SIZE': pool_size(),
+        'DB_MAX_OVERFLOW': int(os.getenv('DB_MAX_OVERFLOW', 5)),
+        'DB_POOL_TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+        'DB_POOL_RECYCLE': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'DB_POOL_PRE_PING': os.getenv('DB_POOL_PRE_PING', '1') != '0',
+        'WEB_CONCURRENCY': int(os.getenv('WEB_CONCURRENCY', 1)),
+        # Reverse proxies in front of the app that set X-Forwarded-For/-Proto.
+        # Off by default: without a proxy, clients could forge their address.
+        'PROXY_FIX_X_FOR': int(os.getenv('PROXY_FIX_X_FOR', 0)),
+        'PROXY_FIX_X_PROTO': int(os.getenv('PROXY_FIX_X_PROTO', 0)),
+        'SOCKETIO_MESSAGE_QUEUE': os.getenv('SOCKETIO_MESSAGE_QUEUE'),
+        'PAYMENT_BACKEND_SECRET': os.getenv('Secret_key_user'),
+        'PAYMENT_BATCH_SIZE': int(os.getenv('PAYMENT_BATCH_SIZE', 500)),
+        'EXPORT_TOKEN': os.getenv('EXPORT_TOKEN'),
+        'METRICS_TOKEN': os.getenv('METRICS_TOKEN'),
+        'EXPORT_BATCH_SIZE': int(os.getenv('EXPORT_BATCH_SIZE', 5000)),
+
+        'GEO_INDEX': os.getenv('GEO_INDEX', '1') != '0',
+        'AVAILABILITY_SLOT_MINUTES': int(os.getenv('AVAILABILITY_SLOT_MINUTES', 60)),
+        'AVAILABILITY_OPEN_HOUR': int(os.getenv('AVAILABILITY_OPEN_HOUR', 9)),
+        'AVAILABILITY_CLOSE_HOUR': int(os.getenv('AVAILABILITY_CLOSE_HOUR', 19)),
+        'AVAILABILITY_TIMEZONE': os.getenv('AVAILABILITY_TIMEZONE', 'Asia/Kolkata'),
+
+        'CLOUDINARY_CLOUD_NAME': os.getenv('CLOUDINARY_CLOUD_NAME'),
+        'CLOUDINARY_API_KEY': os.getenv('CLOUDINARY_API_KEY'),
+        'CLOUDINARY_API_SECRET': os.getenv('CLOUDINARY_API_SECRET'),
+        'MEDIA_GALLERY_PRESET': os.getenv('MEDIA_GALLERY_PRESET', 'thumbnail') or None,
+
+        'MAIL_API_URL': os.getenv('url'),
+        'MAIL_API_KEY': os.getenv('api_key'),
+        'MAIL_SENDER': os.getenv('gmail'),
+        'MAIL_WORKERS': int(os.getenv('MAIL_WORKERS', 4)),
+        'MAIL_QUEUE_SIZE': int(os.getenv('MAIL_QUEUE_SIZE', 1000)),
+        'MAIL_BATCH_SIZE': int(os.getenv('MAIL_BATCH_SIZE', 50)),
+        'MAIL_TIMEOUT': float(os.getenv('MAIL_TIMEOUT', 10)),
+        'MAIL_RETRIES': int(os.getenv('MAIL_RETRIES', 3)),
+
+        'INVOICE_CACHE_DIR': os.getenv('INVOICE_CACHE_DIR'),
+        'INVOICE_PDF_BACKEND': os.getenv('INVOICE_PDF_BACKEND', 'xhtml2pdf'),
+
+        'JINJA_BYTECODE_CACHE_DIR': os.getenv('JINJA_BYTECODE_CACHE_DIR'),
+
+        'USER_CACHE_SIZE': int(os.getenv('USER_CACHE_SIZE', 10000)),
+        'USER_CACHE_TTL': int(os.getenv('USER_CACHE_TTL', 300)),
+
+        'PAGE_CACHE_BACKEND': os.getenv('PAGE_CACHE_BACKEND', 'memory'),
+        'PAGE_CACHE_URL': os.getenv('PAGE_CACHE_URL') or os.getenv('SOCKETIO_MESSAGE_QUEUE'),
+        'PAGE_CACHE_SIZE': int(os.getenv('PAGE_CACHE_SIZE', 2000)),
+        'PAGE_CACHE_TTL': int(os.getenv('PAGE_CACHE_TTL', 120)),
+        'PAGE_CACHE_GEO_PRECISION': int(os.getenv('PAGE_CACHE_GEO_PRECISION', 2)),
+        'PAGE_CACHE_RADIUS_STEP': float(os.getenv('PAGE_CACHE_RADIUS_STEP', 1)),
+
+        'IDENTITY_FILTER_CAPACITY': int(os.getenv('IDENTITY_FILTER_CAPACITY', 100000)),
+        'IDENTITY_FILTER_ERROR_RATE': float(os.getenv('IDENTITY_FILTER_ERROR_RATE', 0.01)),
+        'IDENTITY_FILTER_REFRESH': int(os.getenv('IDENTITY_FILTER_REFRESH', 60)),
+        'IDENTITY_FILTER_REBUILD': int(os.getenv('IDENTITY_FILTER_REBUILD', 900)),
+
+        'OTP_STORE': os.getenv('OTP_STORE', 'database'),
+        'OTP_TTL': int(os.getenv('OTP_TTL', 120)),
+        'OTP_MAX_ATTEMPTS': int(os.getenv('OTP_MAX_ATTEMPTS', 5)),
+        'OTP_EMAIL_LIMIT': int(os.getenv('OTP_EMAIL_LIMIT', 3)),
+        'OTP_IP_LIMIT': int(os.getenv('OTP_IP_LIMIT', 20)),
+        'OTP_THROTTLE_WINDOW': int(os.getenv('OTP_THROTTLE_WINDOW', 600)),
+
+        'COUPON_KEY': os.getenv('COUPON_KEY'),
+        'COUPON_BLOCK_SIZE': int(os.getenv('COUPON_BLOCK_SIZE', 1000)),
+        'COUPON_POOL_LOW_WATER': int(os.getenv('COUPON_POOL_LOW_WATER', 200)),
+    }
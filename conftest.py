@@ -0,0 +1,47 @@
+import os
+import pytest
+
+os.environ.setdefault('url_db', 'sqlite://')
+os.environ.setdefault('secret_key', 'test')
+
+from app import create_app
+from models import db
+from instrumentation import query_budget as _query_budget
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_budget(max_queries, allow_repeats=False): fail if any request in the test issues more queries'
+    )
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+        'INVOICE_CACHE_DIR': str(tmp_path / 'invoices'),
+        'JINJA_BYTECODE_CACHE_DIR': '',
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def query_budget(request):
+    """Fails the test if a request goes over the budget from its
+    ``@pytest.mark.query_budget(n)`` marker, or repeats a SELECT
+    (a likely N+1) unless ``allow_repeats=True``."""
+    marker = request.node.get_closest_marker('query_budget')
+    if marker is None:
+        pytest.fail('query_budget fixture needs a @pytest.mark.query_budget(max_queries) marker')
+    with _query_budget(*marker.args, **marker.kwargs) as seen:
+        yield seen
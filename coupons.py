@@ -0,0 +1,225 @@
+import hashlib, os, secrets, string, time
+from datetime import datetime
+from collections import deque
+from threading import Event, Lock, Thread
+from sqlalchemy.exc import IntegrityError
+from models import db, Coupon, CouponSequence
+
+
+ALPHABET = string.digits + string.ascii_uppercase
+CODE_LENGTH = 10
+CODE_PREFIX = 'CNT-'
+DOMAIN = len(ALPHABET) ** CODE_LENGTH
+HALF_BITS = (DOMAIN.bit_length() + 1) // 2
+HALF_MASK = (1 << HALF_BITS) - 1
+SEQUENCE_NAME = 'coupon'
+
+
+def generate_key():
+    return secrets.token_hex(32)
+
+
+class CodePermutation:
+    def __init__(self, key, rounds=6):
+        self.key = key if isinstance(key, bytes) else bytes.fromhex(key)
+        self.rounds = rounds
+        self._round_keys = [
+            hashlib.blake2b(bytes([i]), key=self.key[:64], digest_size=32).digest()
+            for i in range(rounds)
+        ]
+
+    def _f(self, i, value):
+        digest = hashlib.blake2b(value.to_bytes(8, 'big'), key=self._round_keys[i], digest_size=8).digest()
+        return int.from_bytes(digest, 'big') & HALF_MASK
+
+    def _feistel(self, value):
+        left, right = value >> HALF_BITS, value & HALF_MASK
+        for i in range(self.rounds):
+            left, right = right, left ^ self._f(i, right)
+        return (left << HALF_BITS) | right
+
+    def permute(self, value):
+        if not 0 <= value < DOMAIN:
+            raise ValueError('Coupon counter is out of range')
+        value = self._feistel(value)
+        while value >= DOMAIN:
+            value = self._feistel(value)
+        return value
+
+    def encode(self, value):
+        n = self.permute(value)
+        chars = []
+        for _ in range(CODE_LENGTH):
+            n, r = divmod(n, len(ALPHABET))
+            chars.append(ALPHABET[r])
+        return CODE_PREFIX + ''.join(reversed(chars))
+
+
+def reserve_block(engine, size):
+    for _ in range(3):
+        with engine.begin() as conn:
+            end = conn.execute(
+                db.update(CouponSequence)
+                .where(CouponSequence.name == SEQUENCE_NAME)
+                .values(next_value=CouponSequence.next_value + size)
+                .returning(CouponSequence.next_value)
+            ).scalar()
+        if end is not None:
+            return range(end - size, end)
+        try:
+            with engine.begin() as conn:
+                conn.execute(db.insert(CouponSequence).values(name=SEQUENCE_NAME, next_value=0))
+        except IntegrityError:
+            pass
+    raise RuntimeError('Could not reserve coupon counters')
+
+
+class CouponPool:
+    def __init__(self, app, permutation, block_size=1000, low_water=200):
+        self.app = app
+        self.permutation = permutation
+        self.block_size = block_size
+        self.low_water = low_water
+        self._codes = deque()
+        self._lock = Lock()
+        self._refill = Event()
+        self._pid = None
+        self.issued = 0
+        self.blocks = 0
+        self.empty_takes = 0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._codes.clear()
+                Thread(target=self._run, name='coupon-pool', daemon=True).start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            self._refill.wait()
+            self._refill.clear()
+            try:
+                with self.app.app_context():
+                    while len(self._codes) < self.low_water + self.block_size:
+                        self.fill()
+            except Exception:
+                self.app.logger.exception('Coupon pool refill failed')
+                time.sleep(1)
+
+    def fill(self):
+        block = reserve_block(db.engine, self.block_size)
+        codes = [self.permutation.encode(n) for n in block]
+        with self._lock:
+            self._codes.extend(codes)
+            self.blocks += 1
+
+    def take(self):
+        self._ensure_started()
+        while True:
+            try:
+                code = self._codes.popleft()
+                break
+            except IndexError:
+                self.empty_takes += 1
+                self.fill()
+        self.issued += 1
+        if len(self._codes) < self.low_water:
+            self._refill.set()
+        return code
+
+    def stats(self):
+        return {
+            'available': len(self._codes),
+            'issued': self.issued,
+            'blocks_reserved': self.blocks,
+            'empty_takes': self.empty_takes,
+        }
+
+
+def coupon_state(coupon, now=None):
+    now = now or datetime.utcnow()
+    if coupon.status == 'unused' and coupon.expiry_date <= now:
+        return 'expired'
+    return coupon.status
+
+
+def redeem(session, code, user_id):
+    now = datetime.utcnow()
+    discount = session.execute(
+        db.update(Coupon)
+        .where(
+            Coupon.coupon_code == code,
+            Coupon.user_id == user_id,
+            Coupon.status == 'unused',
+            Coupon.expiry_date > now
+        )
+        .values(status='used', redeemed_at=now)
+        .returning(Coupon.discount)
+    ).first()
+    session.commit()
+    if discount is not None:
+        return discount[0], 'redeemed'
+
+    coupon = Coupon.query.filter_by(coupon_code=code, user_id=user_id).first()
+    if coupon is None:
+        return None, 'not_found'
+    return coupon.discount, coupon_state(coupon, now)
+
+
+def user_coupons(session, user_id, limit=50):
+    return session.query(
+        Coupon.coupon_code,
+        Coupon.discount,
+        Coupon.expiry_date
+    ).filter(
+        Coupon.user_id == user_id,
+        Coupon.status == 'unused',
+        Coupon.expiry_date > datetime.utcnow()
+    ).order_by(Coupon.expiry_date).limit(limit).all()
+
+
+def expiry_statement(now, batch_size):
+    return db.select(Coupon.id).where(
+        Coupon.status == 'unused',
+        Coupon.expiry_date <= now
+    ).limit(batch_size)
+
+
+def expire_coupons(session, batch_size=1000, pause=0.0):
+    expired = 0
+    while True:
+        now = datetime.utcnow()
+        ids = session.scalars(expiry_statement(now, batch_size)).all()
+        if not ids:
+            break
+        expired += session.execute(
+            db.update(Coupon)
+            .where(Coupon.id.in_(ids), Coupon.status == 'unused')
+            .values(status='expired')
+        ).rowcount
+        session.commit()
+        if pause:
+            time.sleep(pause)
+    return expired
+
+
+def benchmark(permutation, count, start=0):
+    seen = set()
+    collisions = 0
+    began = time.perf_counter()
+    for n in range(start, start + count):
+        code = permutation.encode(n)
+        if code in seen:
+            collisions += 1
+        seen.add(code)
+    elapsed = time.perf_counter() - began
+    return {
+        'codes': count,
+        'seconds': elapsed,
+        'codes_per_second': count / elapsed if elapsed else 0.0,
+        'collisions': collisions,
+        'collision_rate': collisions / count if count else 0.0,
+    }
@@ -0,0 +1,127 @@
+import time
+from functools import wraps
+from threading import Lock
+from weakref import WeakKeyDictionary
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql import Select
+
+
+REPLICA = 'replica'
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = Lock()
+        self._pools = WeakKeyDictionary()
+        self.routes = {'primary': 0, REPLICA: 0}
+
+    def _stats(self, pool):
+        return self._pools.setdefault(pool, {
+            'checkouts': 0,
+            'waited': 0,
+            'wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'timeouts': 0,
+        })
+
+    def checkout(self, pool, seconds, timed_out=False):
+        with self._lock:
+            stats = self._stats(pool)
+            if timed_out:
+                stats['timeouts'] += 1
+                return
+            stats['checkouts'] += 1
+            if seconds >= 0.001:
+                stats['waited'] += 1
+            stats['wait_ms'] += seconds * 1000
+            stats['max_wait_ms'] = max(stats['max_wait_ms'], seconds * 1000)
+
+    def route(self, target):
+        with self._lock:
+            self.routes[target] += 1
+
+    def snapshot(self, engines):
+        result = {'routes': dict(self.routes)}
+        with self._lock:
+            for key, engine in engines.items():
+                pool = engine.pool
+                stats = dict(self._stats(pool))
+                stats['avg_wait_ms'] = stats['wait_ms'] / stats['checkouts'] if stats['checkouts'] else 0.0
+                stats['status'] = pool.status()
+                result[key or 'primary'] = stats
+        return result
+
+
+pool_metrics = PoolMetrics()
+
+
+class MeteredQueuePool(QueuePool):
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.checkout(self, time.perf_counter() - started, timed_out=True)
+            raise
+        pool_metrics.checkout(self, time.perf_counter() - started)
+        return connection
+
+
+def _is_memory_sqlite(url):
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config, url):
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    }
+    if url and not _is_memory_sqlite(url):
+        options.update({
+            'poolclass': MeteredQueuePool,
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+        })
+    return options
+
+
+def configure(config):
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(config, config['SQLALCHEMY_DATABASE_URI'])
+    replica_url = config.get('SQLALCHEMY_REPLICA_URI')
+    if replica_url:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA] = {'url': replica_url, **engine_options(config, replica_url)}
+        config['SQLALCHEMY_BINDS'] = binds
+
+
+def read_only(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _routes_to_replica(clause):
+    return (
+        isinstance(clause, Select)
+        and clause._for_update_arg is None
+        and has_app_context()
+        and g.get('db_read_only', False)
+    )
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and REPLICA in self._db.engines:
+            if _routes_to_replica(clause):
+                pool_metrics.route(REPLICA)
+                return self._db.engines[REPLICA]
+            pool_metrics.route('primary')
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
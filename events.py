@@ -0,0 +1,25 @@
+from extensions import socketio, invoice_store
+from feed import group_for
+
+
+def appointment_delta(appointment, changes):
+    return {
+        "id": appointment.id,
+        "status": appointment.status,
+        "group": group_for(appointment.status),
+        "changes": changes
+    }
+
+
+def emit_appointment_update(appointment, changes):
+    socketio.emit(
+        'appointment_updated',
+        appointment_delta(appointment, changes),
+        room=f"appointments_{appointment.user_id}"
+    )
+
+
+outbox_handlers = {
+    'socket': lambda payload: socketio.emit(payload['event'], payload['data'], room=payload['room']),
+    'invoice': lambda payload: invoice_store.generate_async(payload['appointment_id']),
+}
@@ -0,0 +1,130 @@
+import csv, io, json
+from datetime import date, datetime
+from sqlalchemy import and_, func, or_
+from models import db, Appointment, User, ServiceProvider, GadgetType, Coupon
+
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+EXPORT_COLUMNS = (
+    Appointment.id.label('appointment_id'),
+    Appointment.created_at,
+    Appointment.status,
+    Appointment.preferred_time,
+    Appointment.reschedule_time,
+    Appointment.user_id,
+    User.username.label('user_email'),
+    User.mobile_number.label('user_mobile'),
+    Appointment.provider_id,
+    ServiceProvider.name.label('provider_name'),
+    GadgetType.name.label('gadget_type'),
+    Appointment.model,
+    Appointment.amount,
+    Appointment.order_id,
+    Appointment.payment_id,
+    Appointment.payment_status,
+    Appointment.rating,
+    Coupon.coupon_code,
+    Coupon.discount.label('coupon_discount'),
+    Coupon.status.label('coupon_status'),
+)
+FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
+
+def export_query(start=None, end=None, statuses=None):
+    query = db.select(*EXPORT_COLUMNS).select_from(Appointment) \
+        .join(User, User.id == Appointment.user_id) \
+        .join(ServiceProvider, ServiceProvider.id == Appointment.provider_id) \
+        .join(GadgetType, GadgetType.id == Appointment.gadget_type_id) \
+        .outerjoin(Coupon, Coupon.appointment_id == Appointment.id)
+    if start:
+        query = query.where(Appointment.created_at >= start)
+    if end:
+        query = query.where(Appointment.created_at < end)
+    if statuses:
+        query = query.where(Appointment.status.in_(statuses))
+    return query
+
+
+def iter_rows(session, start=None, end=None, statuses=None, after_id=0, batch_size=5000):
+    # Each page is its own short transaction on a server-side cursor, keyed on
+    # the last (appointment, coupon) pair seen, so neither memory nor
+    # transaction length grows with the size of the export. An appointment can
+    # have several coupon rows, so the key includes the coupon; after_id
+    # resumes after a whole appointment.
+    coupon_key = func.coalesce(Coupon.id, 0)
+    query = export_query(start, end, statuses).add_columns(coupon_key) \
+        .order_by(Appointment.id, coupon_key).limit(batch_size)
+    last_id, last_coupon = after_id or 0, None
+    while True:
+        rows = 0
+        if last_coupon is None:
+            page = query.where(Appointment.id > last_id)
+        else:
+            page = query.where(or_(
+                Appointment.id > last_id,
+                and_(Appointment.id == last_id, coupon_key > last_coupon)
+            ))
+        result = session.execute(
+            page,
+            execution_options={'stream_results': True, 'yield_per': min(batch_size, 1000)}
+        )
+        for row in result:
+            rows += 1
+            last_id, last_coupon = row.appointment_id, row[-1]
+            yield row[:-1]
+        session.close()
+        if rows < batch_size:
+            break
+
+
+def _value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_csv(rows, header=True):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(FIELDS)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    for row in rows:
+        writer.writerow([_value(v) for v in row])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def encode_ndjson(rows):
+    for row in rows:
+        yield json.dumps({field: _value(v) for field, v in zip(FIELDS, row)}) + '\n'
+
+
+def encode(rows, fmt, header=True):
+    if fmt == 'csv':
+        return encode_csv(rows, header=header)
+    if fmt == 'ndjson':
+        return encode_ndjson(rows)
+    raise ValueError(f'Unknown export format {fmt!r}')
+
+
+def chunked(lines, size=64 * 1024):
+    chunk = []
+    length = 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(chunk)
+            chunk = []
+            length = 0
+    if chunk:
+        yield ''.join(chunk)
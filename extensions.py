@@ -0,0 +1,97 @@
+import hashlib, os
+from flask import current_app
+from flask_login import LoginManager
+from flask_socketio import SocketIO
+from werkzeug.local import LocalProxy
+from availability import availability
+from cache import TTLCache, create_cache
+from coupons import CodePermutation, CouponPool
+from accounts import IdentityFilter
+from assets import Assets
+from invoices import InvoiceStore
+from mailer import MailQueue
+from otp import create_store as create_otp_store
+from page_cache import PageCache
+
+
+login_manager = LoginManager()
+socketio = SocketIO()
+
+
+def _service(name):
+    return LocalProxy(lambda: current_app.extensions[name])
+
+
+user_cache = _service('user_cache')
+mail_queue = _service('mail_queue')
+otp_store = _service('otp_store')
+invoice_store = _service('invoice_store')
+coupon_pool = _service('coupon_pool')
+page_cache = _service('page_cache')
+identity_filter = _service('identity_filter')
+assets = _service('assets')
+
+
+def init_services(app):
+    config = app.config
+    availability.configure(
+        config['AVAILABILITY_SLOT_MINUTES'],
+        config['AVAILABILITY_OPEN_HOUR'],
+        config['AVAILABILITY_CLOSE_HOUR'],
+        config['AVAILABILITY_TIMEZONE']
+    )
+    app.extensions['assets'] = Assets(app.static_folder)
+    app.add_template_global(app.extensions['assets'].url, 'asset_url')
+    app.extensions['user_cache'] = TTLCache(
+        maxsize=config['USER_CACHE_SIZE'],
+        ttl=config['USER_CACHE_TTL']
+    )
+    # The memory backend is per worker: an invalidation only reaches the
+    # worker that made the change, so run a single worker or use redis.
+    app.extensions['page_cache'] = PageCache(
+        create_cache(
+            config['PAGE_CACHE_BACKEND'],
+            url=config['PAGE_CACHE_URL'],
+            maxsize=config['PAGE_CACHE_SIZE'],
+            ttl=config['PAGE_CACHE_TTL']
+        ),
+        geo_precision=config['PAGE_CACHE_GEO_PRECISION'],
+        radius_step=config['PAGE_CACHE_RADIUS_STEP']
+    )
+    app.extensions['identity_filter'] = IdentityFilter(
+        app,
+        capacity=config['IDENTITY_FILTER_CAPACITY'],
+        error_rate=config['IDENTITY_FILTER_ERROR_RATE'],
+        refresh=config['IDENTITY_FILTER_REFRESH'],
+        rebuild=config['IDENTITY_FILTER_REBUILD']
+    )
+    app.extensions['mail_queue'] = MailQueue(
+        url=config['MAIL_API_URL'],
+        api_key=config['MAIL_API_KEY'],
+        sender=config['MAIL_SENDER'],
+        workers=config['MAIL_WORKERS'],
+        maxsize=config['MAIL_QUEUE_SIZE'],
+        batch_size=config['MAIL_BATCH_SIZE'],
+        timeout=config['MAIL_TIMEOUT'],
+        retries=config['MAIL_RETRIES']
+    )
+    if config['OTP_STORE'] == 'memory' and config['WEB_CONCURRENCY'] > 1:
+        # check_email2 and verify_otp may land on different workers.
+        raise RuntimeError('OTP_STORE=memory is per worker; use database with WEB_CONCURRENCY > 1')
+    app.extensions['otp_store'] = create_otp_store(
+        config['OTP_STORE'],
+        ttl=config['OTP_TTL'],
+        max_attempts=config['OTP_MAX_ATTEMPTS']
+    )
+    app.extensions['invoice_store'] = InvoiceStore(
+        app,
+        cache_dir=config['INVOICE_CACHE_DIR'] or os.path.join(app.instance_path, 'invoices'),
+        backend=config['INVOICE_PDF_BACKEND']
+    )
+    coupon_key = config['COUPON_KEY'] or hashlib.sha256(f"coupon:{config['SECRET_KEY']}".encode()).hexdigest()
+    app.extensions['coupon_pool'] = CouponPool(
+        app,
+        CodePermutation(coupon_key),
+        block_size=config['COUPON_BLOCK_SIZE'],
+        low_water=config['COUPON_POOL_LOW_WATER']
+    )
@@ -0,0 +1,108 @@
+import hashlib
+from sqlalchemy import case, func, or_, select
+from models import Appointment
+
+
+STATUS_GROUPS = {
+    'Pending': ('Pending', 'Pending_Rescheduled'),
+    'Completed': ('Completed',),
+    'Cancelled': ('Cancelled',),
+    'Rescheduled': ('Rescheduled',),
+}
+GROUP_ORDER = ['New', 'Pending', 'Completed', 'Cancelled', 'Rescheduled']
+KNOWN_STATUSES = [s for statuses in STATUS_GROUPS.values() for s in statuses]
+
+FEED_COLUMNS = (
+    Appointment.id,
+    Appointment.model,
+    Appointment.preferred_time,
+    Appointment.status,
+    Appointment.problem_description,
+    Appointment.cancel_reason,
+    Appointment.reschedule_time,
+    Appointment.rating,
+    Appointment.comment,
+    Appointment.payment_status,
+)
+
+
+def group_expr():
+    return case(
+        *[(Appointment.status.in_(statuses), group) for group, statuses in STATUS_GROUPS.items()],
+        else_='New'
+    )
+
+
+def group_for(status):
+    for group, statuses in STATUS_GROUPS.items():
+        if status in statuses:
+            return group
+    return 'New'
+
+
+def group_filter(group):
+    if group == 'New':
+        return or_(Appointment.status.is_(None), Appointment.status.notin_(KNOWN_STATUSES))
+    return Appointment.status.in_(STATUS_GROUPS[group])
+
+
+def change_token(session, user_id, *parts):
+    count, last_update = session.query(
+        func.count(Appointment.id),
+        func.max(Appointment.updated_at)
+    ).filter(Appointment.user_id == user_id).one()
+    raw = '|'.join(map(str, (user_id, count, last_update) + parts))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def serialize(row):
+    item = {
+        "id": row.id,
+        "model": row.model,
+        "preferred_time": row.preferred_time.strftime('%Y-%m-%d %H:%M') if row.preferred_time else None,
+        "status": row.status,
+        "description": row.problem_description,
+        "cancel_reason": row.cancel_reason,
+        "r_time": row.reschedule_time.strftime('%Y-%m-%d %H:%M') if row.reschedule_time else None
+    }
+
+    if row.status == 'Completed':
+        item['has_reviewed'] = bool(row.rating or row.comment)
+        item["payment_status"] = bool(row.payment_status)
+    return item
+
+
+def grouped_statement(user_id, limit):
+    group = group_expr().label('grp')
+    position = func.row_number().over(partition_by=group, order_by=Appointment.id.desc()).label('pos')
+    ranked = select(*FEED_COLUMNS, group, position).where(
+        Appointment.user_id == user_id
+    ).subquery()
+    return select(ranked).where(ranked.c.pos <= limit + 1).order_by(ranked.c.grp, ranked.c.pos)
+
+
+def grouped_page(session, user_id, limit):
+    rows = session.execute(grouped_statement(user_id, limit)).all()
+
+    grouped = {g: [] for g in GROUP_ORDER}
+    cursors = {g: None for g in GROUP_ORDER}
+    for row in rows:
+        if row.pos > limit:
+            cursors[row.grp] = grouped[row.grp][-1]['id']
+        else:
+            grouped[row.grp].append(serialize(row))
+    return grouped, cursors
+
+
+def status_page(session, user_id, group, limit, cursor=None):
+    query = session.query(*FEED_COLUMNS).filter(
+        Appointment.user_id == user_id,
+        group_filter(group)
+    )
+    if cursor:
+        query = query.filter(Appointment.id < cursor)
+    rows = query.order_by(Appointment.id.desc()).limit(limit + 1).all()
+
+    items = [serialize(row) for row in rows[:limit]]
+    next_cursor = items[-1]['id'] if len(rows) > limit else None
+    return items, next_cursor
@@ -0,0 +1,236 @@
+import os, time
+from math import asin, ceil, cos, radians, sin, sqrt
+from threading import Lock
+from sqlalchemy import and_, event, or_, select
+from models import ServiceProvider
+
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+INDEX_PRECISION = int(os.getenv('GEO_INDEX_PRECISION', 5))
+INDEX_TTL = int(os.getenv('GEO_INDEX_TTL', 60))
+MAX_COVER_CELLS = 32
+EARTH_RADIUS_KM = 6371
+
+
+def encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    code = []
+    bits, ch, even = 0, 0, True
+    while len(code) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch = (ch << 1) | 1
+                lng_lo = mid
+            else:
+                ch <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            code.append(BASE32[ch])
+            bits, ch = 0, 0
+    return ''.join(code)
+
+
+def cell_size(precision):
+    lng_bits = ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def bounding_box(lat, lng, radius):
+    lat_range = radius / 111
+    lng_range = min(radius / (111 * max(cos(radians(lat)), 1e-6)), 180.0)
+    return (max(lat - lat_range, -90.0), min(lat + lat_range, 90.0),
+            lng - lng_range, lng + lng_range)
+
+
+def _steps(lo, hi, step):
+    value = lo
+    while value < hi:
+        yield value
+        value += step
+    yield hi
+
+
+def _wrap_lng(lng):
+    return ((lng + 180.0) % 360.0) - 180.0
+
+
+def cover(lat, lng, radius, max_precision=INDEX_PRECISION):
+    lat_min, lat_max, lng_min, lng_max = bounding_box(lat, lng, radius)
+    precision = 1
+    for p in range(max_precision, 0, -1):
+        cell_h, cell_w = cell_size(p)
+        count = (ceil((lat_max - lat_min) / cell_h) + 1) * (ceil((lng_max - lng_min) / cell_w) + 1)
+        if count <= MAX_COVER_CELLS:
+            precision = p
+            break
+
+    cell_h, cell_w = cell_size(precision)
+    cells = set()
+    for la in _steps(lat_min, lat_max, cell_h):
+        for lo in _steps(lng_min, lng_max, cell_w):
+            cells.add(encode(min(la, 89.999999), _wrap_lng(lo), precision))
+    return cells
+
+
+def prefix_range(column, prefix):
+    # A range rather than LIKE 'prefix%': SQLite's LIKE is case-insensitive
+    # and will not use the index. '~' sorts after every base32 character.
+    return and_(column >= prefix, column < prefix + '~')
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    dlat = radians(lat2 - lat1)
+    dlng = radians(lng2 - lng1)
+    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+class CellIndex:
+    def __init__(self, precision=INDEX_PRECISION, ttl=INDEX_TTL):
+        self.precision = precision
+        self.ttl = ttl
+        self._lock = Lock()
+        self._cells = None
+        self._built_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._cells = None
+
+    def current(self):
+        # The snapshot is read once; a concurrent invalidate() only affects
+        # the next lookup, never one that is already walking the cells.
+        with self._lock:
+            if self._cells is None or time.monotonic() - self._built_at > self.ttl:
+                return None
+            return self._cells
+
+    def build(self, rows):
+        cells = [dict() for _ in range(self.precision + 1)]
+        for provider_id, lat, lng, geohash in rows:
+            geohash = geohash or encode(lat, lng)
+            for p in range(1, self.precision + 1):
+                cells[p].setdefault(geohash[:p], []).append((provider_id, lat, lng))
+        with self._lock:
+            self._cells = cells
+            self._built_at = time.monotonic()
+        return cells
+
+    def load(self, session):
+        rows = session.query(
+            ServiceProvider.id,
+            ServiceProvider.latitude,
+            ServiceProvider.longitude,
+            ServiceProvider.geohash
+        ).filter(
+            ServiceProvider.approved.is_(True),
+            ServiceProvider.latitude.isnot(None),
+            ServiceProvider.longitude.isnot(None)
+        ).all()
+        return self.build(rows)
+
+    def candidates(self, cells, lat, lng, radius):
+        found = []
+        for cell in cover(lat, lng, radius, self.precision):
+            found.extend(cells[len(cell)].get(cell, ()))
+        return found
+
+
+cell_index = CellIndex()
+
+
+def candidates_statement(lat, lng, radius):
+    # Rows written by the provider portal have no geohash until the next
+    # geohash-backfill; find those by bounding box instead.
+    cells = cover(lat, lng, radius)
+    lat_min, lat_max, lng_min, lng_max = bounding_box(lat, lng, radius)
+    return select(
+        ServiceProvider.id,
+        ServiceProvider.latitude,
+        ServiceProvider.longitude
+    ).where(
+        ServiceProvider.approved.is_(True),
+        or_(
+            *[prefix_range(ServiceProvider.geohash, cell) for cell in cells],
+            and_(
+                ServiceProvider.geohash.is_(None),
+                ServiceProvider.latitude.between(lat_min, lat_max),
+                ServiceProvider.longitude.between(lng_min, lng_max)
+            )
+        )
+    )
+
+
+def _candidates_sql(session, lat, lng, radius):
+    return session.execute(candidates_statement(lat, lng, radius)).all()
+
+
+def nearby_providers(session, lat, lng, radius, use_index=True):
+    if use_index:
+        cells = cell_index.current()
+        if cells is None:
+            cells = cell_index.load(session)
+        candidates = cell_index.candidates(cells, lat, lng, radius)
+    else:
+        candidates = _candidates_sql(session, lat, lng, radius)
+
+    survivors = []
+    for provider_id, p_lat, p_lng in candidates:
+        distance = haversine(lat, lng, p_lat, p_lng)
+        if distance <= radius:
+            survivors.append((distance, provider_id))
+    survivors.sort()
+    return [(provider_id, distance) for distance, provider_id in survivors]
+
+
+@event.listens_for(ServiceProvider, 'before_insert')
+@event.listens_for(ServiceProvider, 'before_update')
+def _set_geohash(mapper, connection, target):
+    if target.latitude is None or target.longitude is None:
+        target.geohash = None
+    else:
+        target.geohash = encode(target.latitude, target.longitude)
+
+
+@event.listens_for(ServiceProvider, 'after_insert')
+@event.listens_for(ServiceProvider, 'after_update')
+@event.listens_for(ServiceProvider, 'after_delete')
+def _invalidate_index(mapper, connection, target):
+    cell_index.invalidate()
+
+
+def backfill_geohash(session, batch_size=500):
+    # Also corrects providers whose coordinates the portal changed; run it
+    # on a schedule with `flask geohash-backfill --interval`.
+    updated = 0
+    last_id = 0
+    while True:
+        rows = session.query(ServiceProvider).filter(
+            ServiceProvider.id > last_id,
+            ServiceProvider.latitude.isnot(None),
+            ServiceProvider.longitude.isnot(None)
+        ).order_by(ServiceProvider.id).limit(batch_size).all()
+        if not rows:
+            break
+        for provider in rows:
+            geohash = encode(provider.latitude, provider.longitude)
+            if provider.geohash != geohash:
+                provider.geohash = geohash
+                updated += 1
+        last_id = rows[-1].id
+        session.commit()
+    return updated
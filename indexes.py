@@ -0,0 +1,122 @@
+from datetime import datetime
+from sqlalchemy import inspect, select, func, text
+from sqlalchemy.schema import CreateColumn
+from models import db, Appointment, Coupon
+from coupons import expiry_statement
+from feed import grouped_statement
+from geo import candidates_statement
+
+
+def create_missing_tables(engine):
+    existing = set(inspect(engine).get_table_names())
+    missing = [table for table in db.metadata.sorted_tables if table.name not in existing]
+    db.metadata.create_all(engine, tables=missing)
+    return [table.name for table in missing]
+
+
+def add_missing_columns(engine):
+    # Only additive changes: new columns are added, nothing is altered or
+    # dropped. A NOT NULL column without a server default is added nullable,
+    # since existing rows have no value for it.
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    column = column.copy()
+                    column.nullable = True
+                spec = CreateColumn(column).compile(dialect=engine.dialect)
+                table_name = engine.dialect.identifier_preparer.format_table(table)
+                connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {spec}'))
+                added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def ensure_indexes(engine):
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            # Indexes on columns the upgrade has not added yet are left for it.
+            if index.name not in existing and all(column.name in columns for column in index.columns):
+                index.create(engine)
+                created.append(index.name)
+    return created
+
+
+def upgrade(engine):
+    return {
+        'tables': create_missing_tables(engine),
+        'columns': add_missing_columns(engine),
+        'indexes': ensure_indexes(engine),
+    }
+
+
+def hot_queries(user_id=1, provider_id=1, lat=28.6139, lng=77.2090, radius=10):
+    return {
+        'user_appointments': select(Appointment.id, Appointment.status).where(
+            Appointment.user_id == user_id,
+            Appointment.status.in_(['Pending', 'Pending_Rescheduled'])
+        ),
+        'user_appointments_token': select(func.count(Appointment.id), func.max(Appointment.updated_at)).where(
+            Appointment.user_id == user_id
+        ),
+        'user_appointments_grouped': grouped_statement(user_id, 10),
+        'user_coupons': select(Coupon.coupon_code).where(
+            Coupon.user_id == user_id,
+            Coupon.status == 'unused'
+        ).order_by(Coupon.expiry_date),
+        'expired_coupons': expiry_statement(datetime(2024, 1, 1), 1000),
+        'appointment_coupon': select(Coupon.id).where(Coupon.appointment_id == 1),
+        'provider_slot': select(Appointment.id).where(
+            Appointment.provider_id == provider_id,
+            Appointment.preferred_time.between('2024-01-01 09:00', '2024-01-01 11:00')
+        ),
+        'nearby_providers': candidates_statement(lat, lng, radius),
+    }
+
+
+def explain(connection, statement):
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+    if connection.dialect.name == 'sqlite':
+        rows = connection.execute(text(f'EXPLAIN QUERY PLAN {sql}')).fetchall()
+        return [row[-1] for row in rows]
+    return [row[0] for row in connection.execute(text(f'EXPLAIN {sql}')).fetchall()]
+
+
+def is_seq_scan(plan, dialect_name):
+    # SQLite also reports reading back a subquery it has materialised or run
+    # as a co-routine as a SCAN; only full scans of tables count.
+    subqueries = {line.split()[1] for line in plan if line.startswith(('CO-ROUTINE ', 'MATERIALIZE '))}
+    for line in plan:
+        if dialect_name == 'sqlite':
+            if (line.startswith('SCAN ') and 'USING' not in line
+                    and not line.startswith('SCAN (subquery-')
+                    and line.split()[1] not in subqueries):
+                return True
+        elif 'Seq Scan' in line:
+            return True
+    return False
+
+
+def check_query_plans(engine, **params):
+    results = {}
+    with engine.connect() as connection:
+        if connection.dialect.name == 'postgresql':
+            connection.execute(text('SET enable_seqscan = off'))
+        for name, statement in hot_queries(**params).items():
+            plan = explain(connection, statement)
+            results[name] = (not is_seq_scan(plan, connection.dialect.name), plan)
+    return results
@@ -0,0 +1,138 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+from threading import Lock
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+N_PLUS_ONE_THRESHOLD = 3
+READ_PREFIXES = ('SELECT', 'WITH')
+
+
+class RequestQueries:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = (0.0, None)
+        self.statements = Counter()
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.total += duration
+        # Only reads can be an N+1; a request that writes several rows (three
+        # outbox events per payment) repeats its INSERT legitimately.
+        if statement.lstrip()[:6].upper().startswith(READ_PREFIXES):
+            self.statements[statement] += 1
+        if duration > self.slowest[0]:
+            self.slowest = (duration, statement)
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        return {s: n for s, n in self.statements.items() if n >= threshold}
+
+
+class SQLMetrics:
+    def __init__(self, threshold=N_PLUS_ONE_THRESHOLD):
+        self.threshold = threshold
+        self._lock = Lock()
+        self._endpoints = {}
+        self.observers = []
+
+    def add(self, endpoint, queries):
+        for observer in list(self.observers):
+            observer(endpoint, queries)
+        repeated = queries.repeated(self.threshold)
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'db_time_ms': 0.0,
+                'slowest_ms': 0.0,
+                'slowest_statement': None,
+                'n_plus_one': 0,
+                'n_plus_one_statement': None,
+            })
+            stats['requests'] += 1
+            stats['queries'] += queries.count
+            stats['max_queries'] = max(stats['max_queries'], queries.count)
+            stats['db_time_ms'] += queries.total * 1000
+            if queries.slowest[0] * 1000 > stats['slowest_ms']:
+                stats['slowest_ms'] = queries.slowest[0] * 1000
+                stats['slowest_statement'] = queries.slowest[1]
+            if repeated:
+                stats['n_plus_one'] += 1
+                stats['n_plus_one_statement'] = max(repeated, key=repeated.get)
+        return repeated
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+sql_metrics = SQLMetrics()
+
+
+def _current_queries():
+    if has_app_context():
+        return g.get('sql_queries')
+    return None
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start'].pop()
+    queries = _current_queries()
+    if queries is not None:
+        queries.record(statement, duration)
+
+
+def init_app(app, metrics=sql_metrics):
+    @app.before_request
+    def _start_sql_tracking():
+        g.sql_queries = RequestQueries()
+
+    @app.after_request
+    def _finish_sql_tracking(response):
+        queries = g.pop('sql_queries', None)
+        if queries is None:
+            return response
+
+        endpoint = request.endpoint or 'unknown'
+        repeated = metrics.add(endpoint, queries)
+        for statement, n in repeated.items():
+            app.logger.warning('Possible N+1 in %s: statement ran %d times: %s', endpoint, n, statement)
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={queries.total * 1000:.2f};desc="{queries.count} queries"'
+        )
+        return response
+
+
+@contextmanager
+def query_budget(max_queries, allow_repeats=False, metrics=sql_metrics):
+    seen = []
+    observer = lambda endpoint, queries: seen.append((endpoint, queries))
+    metrics.observers.append(observer)
+    try:
+        yield seen
+    finally:
+        metrics.observers.remove(observer)
+
+    for endpoint, queries in seen:
+        if queries.count > max_queries:
+            raise AssertionError(f'{endpoint} issued {queries.count} queries, budget is {max_queries}')
+        repeated = queries.repeated(metrics.threshold)
+        if repeated and not allow_repeats:
+            raise AssertionError(f'{endpoint} repeated statements (possible N+1): {repeated}')
@@ -0,0 +1,147 @@
+import hashlib, os, tempfile, time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from flask import render_template
+from sqlalchemy.orm import joinedload
+from models import db, Appointment
+
+
+INVOICE_TEMPLATE = 'bill.html'
+
+
+def render_xhtml2pdf(html):
+    from xhtml2pdf import pisa
+    pdf_buffer = BytesIO()
+    pisa.CreatePDF(html, dest=pdf_buffer)
+    return pdf_buffer.getvalue()
+
+
+def render_weasyprint(html):
+    from weasyprint import HTML
+    return HTML(string=html).write_pdf()
+
+
+BACKENDS = {
+    'xhtml2pdf': render_xhtml2pdf,
+    'weasyprint': render_weasyprint,
+}
+
+
+def is_billable(appointment):
+    return appointment.status == 'Completed' and bool(appointment.payment_status)
+
+
+def load_invoice_appointment(appointment_id):
+    return Appointment.query.options(
+        joinedload(Appointment.user),
+        joinedload(Appointment.provider)
+    ).filter(Appointment.id == appointment_id).first()
+
+
+class InvoiceStore:
+    def __init__(self, app, cache_dir, backend='xhtml2pdf', workers=1):
+        self.app = app
+        self.cache_dir = cache_dir
+        self.backend = backend
+        self._template_hash = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='invoice')
+
+    def template_hash(self):
+        if self._template_hash is None:
+            source, _, _ = self.app.jinja_env.loader.get_source(self.app.jinja_env, INVOICE_TEMPLATE)
+            self._template_hash = hashlib.sha256(source.encode()).hexdigest()
+        return self._template_hash
+
+    def digest(self, appointment):
+        parts = [
+            self.backend,
+            self.template_hash(),
+            appointment.id,
+            appointment.created_at,
+            appointment.user.username,
+            appointment.problem_description,
+            appointment.model,
+            appointment.purchase_date,
+            appointment.provider.name,
+            appointment.amount,
+            appointment.payment_id,
+            appointment.payment_status,
+        ]
+        return hashlib.sha256('\x1f'.join(map(str, parts)).encode()).hexdigest()
+
+    def path(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], f'{digest}.pdf')
+
+    def render(self, appointment):
+        html = render_template(INVOICE_TEMPLATE, appointment=appointment)
+        return BACKENDS[self.backend](html)
+
+    def get_or_create(self, appointment, force=False):
+        digest = self.digest(appointment)
+        path = self.path(digest)
+        if force or not os.path.exists(path):
+            pdf = self.render(appointment)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pdf)
+            os.replace(tmp_path, path)
+        return digest, path
+
+    def _generate(self, appointment_id):
+        with self.app.app_context():
+            appointment = load_invoice_appointment(appointment_id)
+            if appointment and is_billable(appointment):
+                self.get_or_create(appointment)
+
+    def generate_async(self, appointment_id):
+        return self._executor.submit(self._generate, appointment_id)
+
+    def regenerate_all(self, force=False, batch_size=100):
+        generated = 0
+        query = Appointment.query.options(
+            joinedload(Appointment.user),
+            joinedload(Appointment.provider)
+        ).filter(
+            Appointment.status == 'Completed',
+            Appointment.payment_status.is_(True)
+        ).order_by(Appointment.id)
+
+        last_id = 0
+        while True:
+            batch = query.filter(Appointment.id > last_id).limit(batch_size).all()
+            if not batch:
+                break
+            for appointment in batch:
+                self.get_or_create(appointment, force=force)
+                generated += 1
+            last_id = batch[-1].id
+            db.session.expunge_all()
+        return generated
+
+
+def benchmark(appointment, rounds=10):
+    html = render_template(INVOICE_TEMPLATE, appointment=appointment)
+    results = {}
+    for name, render in BACKENDS.items():
+        try:
+            render(html)
+        except (ImportError, OSError) as e:
+            results[name] = {'error': str(e).splitlines()[0]}
+            continue
+
+        timings = []
+        size = 0
+        for _ in range(rounds):
+            start = time.perf_counter()
+            size = len(render(html))
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        results[name] = {
+            'rounds': rounds,
+            'mean_ms': sum(timings) / rounds * 1000,
+            'p50_ms': timings[rounds // 2] * 1000,
+            'max_ms': timings[-1] * 1000,
+            'bytes': size,
+        }
+    return results
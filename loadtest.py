@@ -0,0 +1,210 @@
+import json, random, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from models import User, ServiceProvider, GadgetType, Appointment, Coupon
+from instrumentation import sql_metrics
+from geo import encode as geohash
+from search import rebuild as rebuild_search
+
+
+GADGETS = ['Mobile', 'Laptop', 'Tablet', 'Television']
+CENTER = (28.6139, 77.2090)
+SPREAD = 0.5
+SCENARIOS = ['show_providers', 'get_average_rating', 'user_appointments', 'book_appointment', 'download_bill']
+
+
+def seed(session, users=200, providers=500, appointments=5000, coupons=1000, seed=0):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    session.execute(insert(GadgetType), [{'id': i + 1, 'name': name} for i, name in enumerate(GADGETS)])
+    session.execute(insert(User), [
+        {'id': i, 'username': f'user{i}@example.com', 'mobile_number': f'9{i:09d}'}
+        for i in range(1, users + 1)
+    ])
+
+    provider_rows = []
+    for i in range(1, providers + 1):
+        lat = CENTER[0] + rng.uniform(-SPREAD, SPREAD)
+        lng = CENTER[1] + rng.uniform(-SPREAD, SPREAD)
+        provider_rows.append({
+            'id': i, 'username': f'provider{i}', 'email': f'provider{i}@example.com',
+            'password_hash': 'x', 'upi': 'bench@upi', 'name': f'Provider {i}',
+            'address': f'{i} Bench Road', 'latitude': lat, 'longitude': lng, 'geohash': geohash(lat, lng),
+            'skills': ', '.join(rng.sample(GADGETS, 2)), 'approved': True,
+            'rating_sum': 0, 'rating_count': 0,
+        })
+
+    appointment_rows = []
+    for i in range(1, appointments + 1):
+        # Every user gets at least one paid appointment so download_bill has something to serve.
+        user_id = i if i <= users else rng.randint(1, users)
+        status = 'Completed' if i <= users else rng.choice(['New', 'Pending', 'Completed', 'Cancelled', 'Rescheduled'])
+        provider = provider_rows[rng.randrange(providers)]
+        rating = rng.randint(1, 5) if status == 'Completed' and rng.random() < 0.7 else None
+        if rating:
+            provider['rating_sum'] += rating
+            provider['rating_count'] += 1
+        appointment_rows.append({
+            'id': i, 'user_id': user_id, 'provider_id': provider['id'],
+            'gadget_type_id': rng.randint(1, len(GADGETS)), 'model': f'Model {i % 97}',
+            'purchase_date': (now - timedelta(days=rng.randint(30, 900))).date(),
+            'problem_description': 'Screen does not turn on',
+            'preferred_time': now + timedelta(hours=rng.randint(-2000, 2000)),
+            'status': status, 'rating': rating, 'amount': rng.randint(200, 5000),
+            'payment_status': status == 'Completed',
+            'payment_id': f'pay_{i}' if status == 'Completed' else None,
+            'created_at': now, 'updated_at': now,
+        })
+
+    session.execute(insert(ServiceProvider), provider_rows)
+    session.execute(insert(Appointment), appointment_rows)
+
+    completed = [a for a in appointment_rows if a['status'] == 'Completed']
+    session.execute(insert(Coupon), [
+        {
+            'user_id': a['user_id'], 'appointment_id': a['id'], 'coupon_code': f'SEED-{n:08d}',
+            'discount': rng.randint(5, 10), 'expiry_date': now + timedelta(days=rng.randint(-30, 30)),
+            'status': 'unused',
+        }
+        for n, a in enumerate(completed[:coupons])
+    ])
+    session.commit()
+    rebuild_search(session)
+
+    return {
+        'users': users,
+        'providers': providers,
+        'appointments': appointments,
+        'coupons': min(coupons, len(completed)),
+        'billable': {a['user_id']: a['id'] for a in reversed(completed)},
+    }
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+class Worker:
+    def __init__(self, app, user_id, billable_id, providers, rng):
+        self.client = app.test_client()
+        self.user_id = user_id
+        self.billable_id = billable_id
+        self.providers = providers
+        self.rng = rng
+        with self.client.session_transaction() as s:
+            s['_user_id'] = str(user_id)
+            s['_fresh'] = True
+            s['lat'] = str(CENTER[0])
+            s['lon'] = str(CENTER[1])
+
+    def request(self, scenario):
+        if scenario == 'show_providers':
+            return self.client.get('/providers?gadget=mobile')
+        if scenario == 'get_average_rating':
+            return self.client.get(f'/provider/{self.rng.randint(1, self.providers)}/average_rating')
+        if scenario == 'user_appointments':
+            return self.client.get('/user/appointments')
+        if scenario == 'book_appointment':
+            when = datetime.utcnow() + timedelta(days=self.rng.randint(1, 60), hours=self.rng.randint(8, 18))
+            return self.client.post(f'/provider/{self.rng.randint(1, self.providers)}?gadget=mobile', data={
+                'purchase_date': '2024-01-01',
+                'problem_description': 'Battery drains quickly',
+                'preferred_time': when.strftime('%Y-%m-%dT%H:00'),
+            })
+        if scenario == 'download_bill':
+            return self.client.get(f'/download_bill/{self.billable_id}')
+        raise ValueError(f'Unknown scenario {scenario}')
+
+
+def run_scenario(workers, scenario, requests, warmup=5):
+    for worker in workers:
+        for _ in range(warmup):
+            worker.request(scenario)
+
+    queries = []
+    observer = lambda endpoint, q: queries.append(q.count)
+    sql_metrics.observers.append(observer)
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    per_worker = [requests // len(workers) + (1 if i < requests % len(workers) else 0) for i in range(len(workers))]
+
+    def drive(worker, count):
+        nonlocal errors
+        for _ in range(count):
+            started = time.perf_counter()
+            response = worker.request(scenario)
+            elapsed = time.perf_counter() - started
+            response.close()
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors += 1
+
+    began = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=len(workers)) as pool:
+            list(pool.map(drive, workers, per_worker))
+    finally:
+        sql_metrics.observers.remove(observer)
+    wall = time.perf_counter() - began
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': len(latencies) / wall if wall else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'queries_per_request': sum(queries) / len(queries) if queries else 0.0,
+        'max_queries': max(queries, default=0),
+    }
+
+
+def run(app, dataset, scenarios=SCENARIOS, concurrency=8, requests=200, warmup=5, seed=0):
+    rng = random.Random(seed)
+    users = rng.sample(sorted(dataset['billable']), min(concurrency, len(dataset['billable'])))
+    workers = [
+        Worker(app, user_id, dataset['billable'][user_id], dataset['providers'], random.Random(rng.random()))
+        for user_id in users
+    ]
+    return {
+        'concurrency': len(workers),
+        'dataset': {k: v for k, v in dataset.items() if k != 'billable'},
+        'scenarios': {scenario: run_scenario(workers, scenario, requests, warmup) for scenario in scenarios},
+    }
+
+
+def compare(baseline, result, tolerance=0.25):
+    regressions = []
+    for scenario, current in result['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(scenario)
+        if not before:
+            continue
+        if current['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{scenario}: p95 {current['p95_ms']:.1f}ms vs baseline {before['p95_ms']:.1f}ms")
+        if current['requests_per_second'] < before['requests_per_second'] / (1 + tolerance):
+            regressions.append(f"{scenario}: {current['requests_per_second']:.0f} req/s vs baseline "
+                               f"{before['requests_per_second']:.0f} req/s")
+        if current['max_queries'] > before['max_queries']:
+            regressions.append(f"{scenario}: up to {current['max_queries']} queries per request vs baseline "
+                               f"{before['max_queries']}")
+        if current['errors'] > before['errors']:
+            regressions.append(f"{scenario}: {current['errors']} errors vs baseline {before['errors']}")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, result):
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2, sort_keys=True)
@@ -0,0 +1,192 @@
+import json, os, time
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MailQueue:
+    def __init__(self, url=None, api_key=None, sender=None, workers=4, maxsize=1000,
+                 batch_size=50, timeout=10, retries=3, backoff=0.5, enqueue_timeout=1.0):
+        self.url = url
+        self.api_key = api_key
+        self.sender = sender
+        self.workers = workers
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = Queue(maxsize=maxsize)
+        self._lock = Lock()
+        self._threads = []
+        self._pid = None
+        self._session = None
+        self._stats = {
+            'enqueued': 0,
+            'sent': 0,
+            'failed': 0,
+            'dropped': 0,
+            'requests': 0,
+            'retries': 0,
+            'split_batches': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0,
+        }
+
+    def _make_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'accept': 'application/json',
+            'api-key': self.api_key or '',
+            'content-type': 'application/json'
+        })
+        return session
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._session = self._make_session()
+            self._threads = []
+            for i in range(self.workers):
+                thread = Thread(target=self._run, name=f'mail-worker-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._pid = os.getpid()
+
+    def send(self, to_email, subject, body):
+        self._ensure_started()
+        try:
+            self._queue.put((to_email, subject, body, time.monotonic()), timeout=self.enqueue_timeout)
+        except Full:
+            self._bump('dropped')
+            return False
+        self._bump('enqueued')
+        return True
+
+    def join(self):
+        self._queue.join()
+
+    def _bump(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                delivered = self._deliver(batch)
+                now = time.monotonic()
+                with self._lock:
+                    self._stats['sent'] += len(delivered)
+                    self._stats['failed'] += len(batch) - len(delivered)
+                    for message in delivered:
+                        latency = now - message[3]
+                        self._stats['latency_total'] += latency
+                        self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _payload(self, batch):
+        to_email, subject, body, _ = batch[0]
+        payload = {
+            "sender": {"email": self.sender},
+            "subject": subject,
+            "htmlContent": body
+        }
+        if len(batch) == 1:
+            payload["to"] = [{"email": to_email}]
+        else:
+            payload["messageVersions"] = [
+                {"to": [{"email": m[0]}], "subject": m[1], "htmlContent": m[2]}
+                for m in batch
+            ]
+        return payload
+
+    def _post(self, payload):
+        import requests
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._bump('retries')
+                time.sleep(self.backoff * (2 ** (attempt - 1)))
+            self._bump('requests')
+            try:
+                response = self._session.post(self.url, json=payload, timeout=self.timeout)
+            except requests.RequestException:
+                continue
+            if response.status_code < 500 and response.status_code != 429:
+                return response.status_code
+        return None
+
+    def _deliver(self, batch):
+        status = self._post(self._payload(batch))
+        if status is not None and 200 <= status < 300:
+            return batch
+        # A 4xx rejects the whole request, usually because of one message
+        # (a bad address); send the batch one by one so the rest still arrive.
+        if status is not None and len(batch) > 1:
+            self._bump('split_batches')
+            return [message for message in batch if self._deliver([message])]
+        return []
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self._stats)
+        delivered = stats.pop('latency_total')
+        stats['queue_depth'] = self._queue.qsize()
+        stats['workers'] = len(self._threads)
+        stats['latency_avg'] = delivered / stats['sent'] if stats['sent'] else 0.0
+        return stats
+
+
+class StubMailServer:
+    def __init__(self, host='127.0.0.1', port=0, status=201):
+        self.requests = []
+        self.status = status
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('content-length', 0))
+                server.requests.append({
+                    'headers': dict(self.headers),
+                    'json': json.loads(self.rfile.read(length) or b'null')
+                })
+                self.send_response(server.status)
+                self.send_header('content-type', 'application/json')
+                self.end_headers()
+                self.wfile.write(b'{}')
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self.url = f'http://{host}:{self._httpd.server_address[1]}/'
+        self._thread = Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,68 @@
+from functools import lru_cache
+from flask import current_app
+
+
+UPLOADS_PREFIX = '/uploads/'
+URL_CACHE_SIZE = 4096
+
+PRESETS = {
+    None: {},
+    'original': {'fetch_format': 'auto', 'quality': 'auto'},
+    'thumbnail': {'width': 480, 'height': 360, 'crop': 'fill', 'fetch_format': 'auto', 'quality': 'auto'},
+}
+
+_configured = False
+
+
+def _cloudinary():
+    global _configured
+    import cloudinary
+    if not _configured:
+        config = current_app.config
+        cloudinary.config(
+            cloud_name=config['CLOUDINARY_CLOUD_NAME'],
+            api_key=config['CLOUDINARY_API_KEY'],
+            api_secret=config['CLOUDINARY_API_SECRET'],
+            secure=True
+        )
+        _configured = True
+    return cloudinary
+
+
+# Building a URL is pure string work in the SDK, but it re-parses the options
+# on every call and the same public ids repeat across pages.
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def _build_url(public_id, preset):
+    return _cloudinary().CloudinaryImage(public_id).build_url(secure=True, **PRESETS[preset])
+
+
+def media_url(filename, preset=None):
+    if preset not in PRESETS:
+        raise ValueError(f'Unknown media preset {preset!r}')
+    return _build_url(filename, preset)
+
+
+def resolve(path, preset=None):
+    if not path:
+        return path
+    if path.startswith(('http://', 'https://', '//')):
+        return path
+    if path.startswith(UPLOADS_PREFIX):
+        path = path[len(UPLOADS_PREFIX):]
+    return media_url(path, preset)
+
+
+def resolve_all(paths, preset=None):
+    return {path: resolve(path, preset) for path in set(paths) if path}
+
+
+def stats():
+    info = _build_url.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        'size': info.currsize,
+        'maxsize': info.maxsize,
+        'hits': info.hits,
+        'misses': info.misses,
+        'hit_ratio': info.hits / lookups if lookups else 0.0,
+    }
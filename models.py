@@ -2,8 +2,9 @@ from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model, UserMixin):
     __tablename__ = 'user'
@@ -22,6 +23,9 @@ class User(db.Model, UserMixin):
 
 class ServiceProvider(db.Model,  UserMixin):
     __tablename__ = 'service_provider'
+    __table_args__ = (
+        db.Index('ix_service_provider_approved_lat_lng', 'approved', 'latitude', 'longitude'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -32,6 +36,9 @@ class ServiceProvider(db.Model,  UserMixin):
     aadhar = db.Column(db.String(12))
     upi = db.Column(db.String(15), nullable=False)
     address = db.Column(db.String(250))
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), index=True)
     experience_years = db.Column(db.Integer)
     skills = db.Column(db.Text)  
 
@@ -43,6 +50,9 @@ class ServiceProvider(db.Model,  UserMixin):
     approved = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
     appointments = db.relationship('Appointment', back_populates='provider')
     works = db.relationship('ProviderProfileWork', back_populates='provider')
 
@@ -51,6 +61,12 @@ class ServiceProvider(db.Model,  UserMixin):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return 0.0
+        return self.rating_sum / self.rating_count
+
 
 class Admin(db.Model):
     __tablename__ = 'admin'
@@ -76,6 +92,13 @@ class GadgetType(db.Model):
 
 class Appointment(db.Model):
     __tablename__ = 'appointment'
+    __table_args__ = (
+        db.Index('ix_appointment_user_status', 'user_id', 'status'),
+        db.Index('ix_appointment_user_updated', 'user_id', 'updated_at'),
+        db.Index('ix_appointment_provider_status_rating', 'provider_id', 'status', 'rating'),
+        db.Index('ix_appointment_payment_id', 'payment_id'),
+        db.Index('ix_appointment_provider_time', 'provider_id', 'preferred_time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -121,16 +144,91 @@ class ProviderProfileWork(db.Model):
 
 class Coupon(db.Model):
     __tablename__ = 'coupon'
-    
+    __table_args__ = (
+        db.Index('ix_coupon_user_status_expiry', 'user_id', 'status', 'expiry_date'),
+        db.Index('ix_coupon_status_expiry', 'status', 'expiry_date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)        
-    appointment_id = db.Column(db.Integer, nullable=False) 
+    appointment_id = db.Column(db.Integer, nullable=False, index=True) 
     coupon_code = db.Column(db.String(20), unique=True)  
     discount = db.Column(db.Integer)   
     expiry_date = db.Column(db.DateTime, nullable=False)
     value = db.Column(db.Integer, default=10)             
     status = db.Column(db.String(20), default="unused")   
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
+    redeemed_at = db.Column(db.DateTime, nullable=True)
+
+
+class OTPCode(db.Model):
+    __tablename__ = 'otp_code'
+
+    email = db.Column(db.String(80), primary_key=True)
+    code_hash = db.Column(db.String(64), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+
+
+class OTPThrottle(db.Model):
+    __tablename__ = 'otp_throttle'
+
+    key = db.Column(db.String(120), primary_key=True)
+    window_end = db.Column(db.DateTime, nullable=False, index=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
 
 
+class CouponSequence(db.Model):
+    __tablename__ = 'coupon_sequence'
+
+    name = db.Column(db.String(40), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class OutboxEvent(db.Model):
+    __tablename__ = 'outbox_event'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(40), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    dispatched_at = db.Column(db.DateTime, nullable=True, index=True)
+
+
+class ProviderSearch(db.Model):
+    __tablename__ = 'provider_search'
+
+    provider_id = db.Column(db.Integer, db.ForeignKey('service_provider.id', ondelete='CASCADE'), primary_key=True)
+    name = db.Column(db.String(120))
+    skills = db.Column(db.String(250))
+    skill_keys = db.Column(db.String(250))
+    address = db.Column(db.String(250))
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return 0.0
+        return self.rating_sum / self.rating_count
+
+
+class DailyStats(db.Model):
+    __tablename__ = 'daily_stats'
+    __table_args__ = (
+        db.Index('ix_daily_stats_day', 'day'),
+    )
+
+    # Platform-wide totals are summed over providers at read time, so no
+    # single row is updated by every transaction. provider_id 0 is reserved.
+    provider_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    bookings = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    completions = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    cancellations = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    revenue = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    coupons_issued = db.Column(db.Integer, nullable=False, default=0, server_default='0')
@@ -0,0 +1,170 @@
+import hashlib, hmac, os, secrets, time
+from datetime import datetime, timedelta
+from threading import Event, Lock, Thread
+from sqlalchemy.exc import IntegrityError
+from models import db, OTPCode, OTPThrottle
+
+
+def generate_otp():
+    return str(secrets.randbelow(900000) + 100000)
+
+
+def _hash(otp):
+    return hashlib.sha256(otp.encode()).hexdigest()
+
+
+class MemoryOTPStore:
+    def __init__(self, ttl=120, max_attempts=5, sweep_interval=30):
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self._codes = {}
+        self._windows = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._sweeper_pid = None
+
+    def start(self):
+        if self._sweeper_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sweeper_pid != os.getpid():
+                Thread(target=self._sweep_loop, name='otp-sweeper', daemon=True).start()
+                self._sweeper_pid = os.getpid()
+
+    def stop(self):
+        self._stop.set()
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            self.sweep()
+
+    def sweep(self):
+        now = time.monotonic()
+        with self._lock:
+            for email in [k for k, v in self._codes.items() if v[1] <= now]:
+                del self._codes[email]
+            for key in [k for k, v in self._windows.items() if v[0] <= now]:
+                del self._windows[key]
+
+    def issue(self, email):
+        self.start()
+        otp = generate_otp()
+        with self._lock:
+            self._codes[email] = [_hash(otp), time.monotonic() + self.ttl, 0]
+        return otp
+
+    def verify(self, email, otp):
+        with self._lock:
+            entry = self._codes.get(email)
+            if entry is None:
+                return False
+            if entry[1] <= time.monotonic():
+                del self._codes[email]
+                return False
+            if hmac.compare_digest(entry[0], _hash(otp or '')):
+                del self._codes[email]
+                return True
+            entry[2] += 1
+            if entry[2] >= self.max_attempts:
+                del self._codes[email]
+            return False
+
+    def hit(self, key, limit, window):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._windows.get(key)
+            if entry is None or entry[0] <= now:
+                entry = self._windows[key] = [now + window, 0]
+            entry[1] += 1
+            return entry[1] <= limit
+
+
+class DatabaseOTPStore:
+    def __init__(self, ttl=120, max_attempts=5, sweep_interval=300):
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+
+    def start(self):
+        pass
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.sweep()
+
+    def sweep(self):
+        now = datetime.utcnow()
+        OTPCode.query.filter(OTPCode.expires_at <= now).delete(synchronize_session=False)
+        OTPThrottle.query.filter(OTPThrottle.window_end <= now).delete(synchronize_session=False)
+        db.session.commit()
+
+    def issue(self, email):
+        self._maybe_sweep()
+        otp = generate_otp()
+        values = {
+            'code_hash': _hash(otp),
+            'expires_at': datetime.utcnow() + timedelta(seconds=self.ttl),
+            'attempts': 0
+        }
+        if not OTPCode.query.filter_by(email=email).update(values):
+            try:
+                with db.session.begin_nested():
+                    db.session.add(OTPCode(email=email, **values))
+            except IntegrityError:
+                # A concurrent request for the same email inserted first.
+                OTPCode.query.filter_by(email=email).update(values)
+        db.session.commit()
+        return otp
+
+    def verify(self, email, otp):
+        entry = OTPCode.query.filter_by(email=email).with_for_update().first()
+        if entry is None:
+            return False
+
+        ok = False
+        if entry.expires_at <= datetime.utcnow():
+            db.session.delete(entry)
+        elif hmac.compare_digest(entry.code_hash, _hash(otp or '')):
+            db.session.delete(entry)
+            ok = True
+        else:
+            entry.attempts += 1
+            if entry.attempts >= self.max_attempts:
+                db.session.delete(entry)
+        db.session.commit()
+        return ok
+
+    def hit(self, key, limit, window):
+        now = datetime.utcnow()
+        updated = OTPThrottle.query.filter(
+            OTPThrottle.key == key,
+            OTPThrottle.window_end > now
+        ).update({OTPThrottle.count: OTPThrottle.count + 1}, synchronize_session=False)
+
+        if not updated:
+            OTPThrottle.query.filter(OTPThrottle.key == key).delete(synchronize_session=False)
+            db.session.add(OTPThrottle(key=key, window_end=now + timedelta(seconds=window), count=1))
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                return self.hit(key, limit, window)
+            return True
+
+        db.session.commit()
+        count = db.session.query(OTPThrottle.count).filter(OTPThrottle.key == key).scalar()
+        return count <= limit
+
+
+BACKENDS = {
+    'memory': MemoryOTPStore,
+    'database': DatabaseOTPStore,
+}
+
+
+def create_store(backend='memory', **kwargs):
+    return BACKENDS[backend](**kwargs)
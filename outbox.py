@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+from models import db, OutboxEvent
+
+
+# outbox-dispatch leaves events this young to the request that is
+# delivering them inline.
+DISPATCH_GRACE = 60
+
+
+def enqueue(session, kind, payload):
+    event = OutboxEvent(kind=kind, payload=payload)
+    session.add(event)
+    return event
+
+
+def dispatch(session, handlers, events, logger=None):
+    done = []
+    for event_id, kind, payload in events:
+        try:
+            handlers[kind](payload)
+        except Exception:
+            if logger:
+                logger.exception('Outbox event %s (%s) failed', event_id, kind)
+            continue
+        done.append(event_id)
+
+    # Its own short transaction: the caller's business commit is already done.
+    if done:
+        session.execute(
+            db.update(OutboxEvent)
+            .where(OutboxEvent.id.in_(done))
+            .values(dispatched_at=datetime.utcnow())
+        )
+        session.commit()
+    return len(done)
+
+
+def dispatch_pending(session, handlers, batch_size=100, grace=DISPATCH_GRACE, logger=None):
+    dispatched = 0
+    last_id = 0
+    cutoff = datetime.utcnow() - timedelta(seconds=grace)
+    while True:
+        events = session.query(OutboxEvent.id, OutboxEvent.kind, OutboxEvent.payload).filter(
+            OutboxEvent.dispatched_at.is_(None),
+            OutboxEvent.created_at < cutoff,
+            OutboxEvent.id > last_id
+        ).order_by(OutboxEvent.id).limit(batch_size).all()
+        if not events:
+            break
+        dispatched += dispatch(session, handlers, events, logger)
+        last_id = events[-1].id
+    return dispatched
+
@@ -0,0 +1,98 @@
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from models import ServiceProvider, ProviderProfileWork
+
+
+LISTINGS = 'providers'
+
+
+class PageCache:
+    def __init__(self, backend, geo_precision=2, radius_step=1.0):
+        self.backend = backend
+        self.geo_precision = geo_precision
+        self.radius_step = radius_step
+        self.renders = 0
+
+    def quantize(self, lat, lng, radius):
+        step = self.radius_step
+        return (
+            round(lat, self.geo_precision),
+            round(lng, self.geo_precision),
+            max(step, round(radius / step) * step)
+        )
+
+    def _key(self, namespace, parts):
+        generation = self.backend.counter(namespace)
+        return ':'.join([namespace, str(generation)] + [str(p) for p in parts])
+
+    def fetch(self, namespace, parts, render):
+        key = self._key(namespace, parts)
+        page = self.backend.get(key)
+        if page is None:
+            page = render()
+            self.renders += 1
+            self.backend.set(key, page)
+        return page
+
+    def provider(self, provider_id, gadget, render):
+        return self.fetch(f'provider:{provider_id}', [gadget], render)
+
+    def listing(self, lat, lng, radius, parts, render):
+        if lat is None or lng is None:
+            return self.fetch(LISTINGS, ['all'] + list(parts), lambda: render(None, None, radius))
+        lat, lng, radius = self.quantize(lat, lng, radius)
+        return self.fetch(LISTINGS, [lat, lng, radius] + list(parts), lambda: render(lat, lng, radius))
+
+    def invalidate_provider(self, provider_id):
+        self.backend.incr(f'provider:{provider_id}')
+        self.backend.incr(LISTINGS)
+
+    def invalidate_listings(self):
+        self.backend.incr(LISTINGS)
+
+    def stats(self):
+        stats = self.backend.stats()
+        stats['renders'] = self.renders
+        return stats
+
+
+def mark_stale(target_session, provider_id):
+    # For writes that bypass the mapper events below, e.g. Core UPDATEs.
+    if target_session is not None and provider_id is not None:
+        target_session.info.setdefault('stale_providers', set()).add(provider_id)
+
+
+@event.listens_for(ServiceProvider, 'after_insert')
+@event.listens_for(ServiceProvider, 'after_update')
+@event.listens_for(ServiceProvider, 'after_delete')
+def _provider_changed(mapper, connection, target):
+    mark_stale(object_session(target), target.id)
+
+
+@event.listens_for(ProviderProfileWork, 'after_insert')
+@event.listens_for(ProviderProfileWork, 'after_update')
+@event.listens_for(ProviderProfileWork, 'after_delete')
+def _work_changed(mapper, connection, target):
+    mark_stale(object_session(target), target.provider_id)
+
+
+# Invalidate only once the change is visible to other requests; doing it at
+# flush time would let a concurrent request re-cache the old page. Both events
+# also fire for savepoints, which decide nothing about the outer transaction.
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    if session.in_nested_transaction():
+        return
+    stale = session.info.pop('stale_providers', None)
+    if stale and has_app_context() and 'page_cache' in current_app.extensions:
+        cache = current_app.extensions['page_cache']
+        for provider_id in stale:
+            cache.invalidate_provider(provider_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    if session.in_nested_transaction():
+        return
+    session.info.pop('stale_providers', None)
@@ -0,0 +1,95 @@
+from sqlalchemy import func
+from models import db, ServiceProvider, Appointment
+from page_cache import mark_stale
+from search import sync_rating
+from rollups import record as record_rollup
+
+
+def record_rating(session, provider_id, old_rating, new_rating):
+    sum_delta = new_rating - (old_rating or 0)
+    count_delta = 0 if old_rating else 1
+    session.execute(
+        db.update(ServiceProvider)
+        .where(ServiceProvider.id == provider_id)
+        .values(
+            rating_sum=ServiceProvider.rating_sum + sum_delta,
+            rating_count=ServiceProvider.rating_count + count_delta
+        )
+    )
+    sync_rating(session, provider_id)
+    mark_stale(session, provider_id)
+    record_rollup(session, provider_id, rating_sum=sum_delta, rating_count=count_delta)
+
+
+def average_ratings(session, provider_ids):
+    ratings = {provider_id: 0.0 for provider_id in provider_ids}
+    if not ratings:
+        return ratings
+
+    rows = session.query(
+        ServiceProvider.id,
+        ServiceProvider.rating_sum,
+        ServiceProvider.rating_count
+    ).filter(ServiceProvider.id.in_(ratings)).all()
+
+    for provider_id, rating_sum, rating_count in rows:
+        if rating_count:
+            ratings[provider_id] = rating_sum / rating_count
+    return ratings
+
+
+def actual_aggregates(session, provider_ids=None):
+    query = session.query(
+        Appointment.provider_id,
+        func.coalesce(func.sum(Appointment.rating), 0),
+        func.count(Appointment.rating)
+    ).filter(
+        Appointment.status == 'Completed',
+        Appointment.rating.isnot(None)
+    )
+    if provider_ids is not None:
+        query = query.filter(Appointment.provider_id.in_(provider_ids))
+    rows = query.group_by(Appointment.provider_id).all()
+    return {provider_id: (int(rating_sum), rating_count) for provider_id, rating_sum, rating_count in rows}
+
+
+def find_drift(session, batch_size=1000):
+    drift = []
+    last_id = 0
+    while True:
+        providers = session.query(
+            ServiceProvider.id,
+            ServiceProvider.rating_sum,
+            ServiceProvider.rating_count
+        ).filter(ServiceProvider.id > last_id).order_by(ServiceProvider.id).limit(batch_size).all()
+        if not providers:
+            break
+
+        actual = actual_aggregates(session, [p.id for p in providers])
+        for provider_id, rating_sum, rating_count in providers:
+            expected = actual.get(provider_id, (0, 0))
+            if (rating_sum, rating_count) != expected:
+                drift.append({
+                    'provider_id': provider_id,
+                    'stored': (rating_sum, rating_count),
+                    'actual': expected
+                })
+        last_id = providers[-1].id
+    return drift
+
+
+def repair(session, provider_ids=None):
+    if provider_ids is None:
+        provider_ids = [d['provider_id'] for d in find_drift(session)]
+    actual = actual_aggregates(session, provider_ids)
+    for provider_id in provider_ids:
+        rating_sum, rating_count = actual.get(provider_id, (0, 0))
+        session.execute(
+            db.update(ServiceProvider)
+            .where(ServiceProvider.id == provider_id)
+            .values(rating_sum=rating_sum, rating_count=rating_count)
+        )
+        sync_rating(session, provider_id)
+        mark_stale(session, provider_id)
+    session.commit()
+    return len(provider_ids)
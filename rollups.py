@@ -0,0 +1,137 @@
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from models import Appointment, Coupon, DailyStats
+
+
+PLATFORM = 0
+METRICS = ('bookings', 'completions', 'cancellations', 'revenue', 'rating_sum', 'rating_count', 'coupons_issued')
+
+
+def _increment(session, provider_id, day, deltas):
+    key = (DailyStats.provider_id == provider_id, DailyStats.day == day)
+    values = {metric: getattr(DailyStats, metric) + delta for metric, delta in deltas.items()}
+    if session.execute(update(DailyStats).where(*key).values(**values)).rowcount:
+        return
+    try:
+        with session.begin_nested():
+            session.execute(insert(DailyStats).values(provider_id=provider_id, day=day, **deltas))
+    except IntegrityError:
+        # Another transaction created the row first; add to it instead.
+        session.execute(update(DailyStats).where(*key).values(**values))
+
+
+def record_many(session, deltas_by_provider, day=None):
+    # Rows are locked in provider order so concurrent batches cannot deadlock.
+    day = day or datetime.utcnow().date()
+    for provider_id, deltas in sorted(deltas_by_provider.items()):
+        deltas = {metric: delta for metric, delta in deltas.items() if delta}
+        if deltas:
+            _increment(session, provider_id, day, deltas)
+
+
+def record(session, provider_id, day=None, **deltas):
+    record_many(session, {provider_id: deltas}, day)
+
+
+def record_payments(session, appointments):
+    deltas = defaultdict(Counter)
+    for appointment in appointments:
+        deltas[appointment.provider_id].update(
+            completions=1,
+            revenue=appointment.amount or 0,
+            coupons_issued=1
+        )
+    record_many(session, deltas)
+
+
+def _day(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _aggregate(session, start, end):
+    totals = defaultdict(Counter)
+
+    def collect(column, filters, **metrics):
+        day = func.date(column)
+        rows = session.query(
+            Appointment.provider_id, day, *metrics.values()
+        ).filter(column >= start, column < end, *filters).group_by(Appointment.provider_id, day)
+        for provider_id, row_day, *values in rows:
+            totals[(provider_id, _day(row_day))].update(dict(zip(metrics, (int(v or 0) for v in values))))
+
+    collect(Appointment.created_at, [], bookings=func.count(Appointment.id))
+    collect(
+        Appointment.updated_at,
+        [Appointment.status == 'Completed', Appointment.payment_status.is_(True)],
+        completions=func.count(Appointment.id),
+        revenue=func.sum(func.coalesce(Appointment.amount, 0))
+    )
+    collect(Appointment.updated_at, [Appointment.status == 'Cancelled'], cancellations=func.count(Appointment.id))
+    collect(
+        Appointment.updated_at,
+        [Appointment.rating.isnot(None)],
+        rating_sum=func.sum(Appointment.rating),
+        rating_count=func.count(Appointment.rating)
+    )
+
+    day = func.date(Coupon.created_at)
+    rows = session.query(Appointment.provider_id, day, func.count(Coupon.id)).join(
+        Appointment, Appointment.id == Coupon.appointment_id
+    ).filter(Coupon.created_at >= start, Coupon.created_at < end).group_by(Appointment.provider_id, day)
+    for provider_id, row_day, issued in rows:
+        totals[(provider_id, _day(row_day))]['coupons_issued'] += issued
+
+    return totals
+
+
+def backfill(session, start, end, days_per_batch=31):
+    # Rebuilds whole days from the fact tables. Completions, cancellations and
+    # ratings are dated by updated_at, the closest record of when they happened.
+    # Run it for days that are over: live increments for today would be lost.
+    rebuilt = 0
+    while start < end:
+        batch_end = min(start + timedelta(days=days_per_batch), end)
+        totals = _aggregate(session, datetime.combine(start, datetime.min.time()),
+                            datetime.combine(batch_end, datetime.min.time()))
+        session.execute(delete(DailyStats).where(DailyStats.day >= start, DailyStats.day < batch_end))
+        if totals:
+            session.execute(insert(DailyStats), [
+                {'provider_id': provider_id, 'day': row_day, **{m: metrics.get(m, 0) for m in METRICS}}
+                for (provider_id, row_day), metrics in totals.items()
+            ])
+        session.commit()
+        rebuilt += len(totals)
+        start = batch_end
+    return rebuilt
+
+
+def daily(session, provider_id=PLATFORM, start=None, end=None):
+    end = end or datetime.utcnow().date() + timedelta(days=1)
+    start = start or end - timedelta(days=31)
+    if provider_id == PLATFORM:
+        rows = session.query(
+            DailyStats.day, *(func.sum(getattr(DailyStats, m)).label(m) for m in METRICS)
+        ).filter(
+            DailyStats.provider_id != PLATFORM,
+            DailyStats.day >= start,
+            DailyStats.day < end
+        ).group_by(DailyStats.day).order_by(DailyStats.day).all()
+    else:
+        rows = session.query(DailyStats).filter(
+            DailyStats.provider_id == provider_id,
+            DailyStats.day >= start,
+            DailyStats.day < end
+        ).order_by(DailyStats.day).all()
+    return [dict({'day': _day(row.day).isoformat()}, **{m: int(getattr(row, m) or 0) for m in METRICS}) for row in rows]
+
+
+def summarize(days):
+    totals = Counter()
+    for row in days:
+        totals.update({m: row[m] for m in METRICS})
+    summary = {m: totals[m] for m in METRICS}
+    summary['completion_rate'] = totals['completions'] / totals['bookings'] if totals['bookings'] else 0.0
+    summary['average_rating'] = totals['rating_sum'] / totals['rating_count'] if totals['rating_count'] else 0.0
+    return summary
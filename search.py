@@ -0,0 +1,144 @@
+import re
+from sqlalchemy import delete, event, insert, literal, select, update
+from models import ServiceProvider, ProviderSearch
+
+
+SKILL_SEPARATORS = re.compile(r'[,;/|\n]+')
+SKILL_WIDTH = ProviderSearch.__table__.c.skill_keys.type.length
+
+
+def parse_skills(text):
+    skills = []
+    seen = set()
+    for skill in SKILL_SEPARATORS.split(text or ''):
+        skill = ' '.join(skill.split())
+        if skill and skill.lower() not in seen:
+            seen.add(skill.lower())
+            skills.append(skill)
+    return skills
+
+
+def skill_keys(skills):
+    keys = ',' + ','.join(s.lower() for s in skills) + ','
+    return keys if len(keys) <= SKILL_WIDTH else keys[:keys.rfind(',', 0, SKILL_WIDTH) + 1]
+
+
+def refresh(connection, provider_id, skills_text):
+    skills = parse_skills(skills_text)
+    connection.execute(delete(ProviderSearch).where(ProviderSearch.provider_id == provider_id))
+    connection.execute(insert(ProviderSearch).from_select(
+        ['provider_id', 'name', 'skills', 'skill_keys', 'address', 'latitude', 'longitude',
+         'rating_sum', 'rating_count'],
+        select(
+            ServiceProvider.id,
+            ServiceProvider.name,
+            literal(', '.join(skills)[:SKILL_WIDTH]),
+            literal(skill_keys(skills)),
+            ServiceProvider.address,
+            ServiceProvider.latitude,
+            ServiceProvider.longitude,
+            ServiceProvider.rating_sum,
+            ServiceProvider.rating_count
+        ).where(ServiceProvider.id == provider_id, ServiceProvider.approved.is_(True))
+    ))
+
+
+def sync_rating(session, provider_id):
+    provider = select(ServiceProvider).where(ServiceProvider.id == provider_id)
+    session.execute(
+        update(ProviderSearch)
+        .where(ProviderSearch.provider_id == provider_id)
+        .values(
+            rating_sum=provider.with_only_columns(ServiceProvider.rating_sum).scalar_subquery(),
+            rating_count=provider.with_only_columns(ServiceProvider.rating_count).scalar_subquery()
+        )
+    )
+
+
+def skill_filter(skill):
+    # Providers describe skills freely ("Mobile repair"), so match within a
+    # skill rather than requiring the whole token.
+    return ProviderSearch.skill_keys.contains(skill.strip().lower(), autoescape=True)
+
+
+def document(provider):
+    skills = parse_skills(provider.skills)
+    return ProviderSearch(
+        provider_id=provider.id,
+        name=provider.name,
+        skills=', '.join(skills)[:SKILL_WIDTH],
+        skill_keys=skill_keys(skills),
+        address=provider.address,
+        latitude=provider.latitude,
+        longitude=provider.longitude,
+        rating_sum=provider.rating_sum or 0,
+        rating_count=provider.rating_count or 0
+    )
+
+
+def _undocumented(session, skill=None, provider_ids=None):
+    # Providers are approved and edited by the portal, which does not fire this
+    # app's mapper events. Until the next rebuild, build their documents from
+    # service_provider on the fly rather than leaving them out of listings.
+    query = session.query(ServiceProvider).outerjoin(
+        ProviderSearch, ProviderSearch.provider_id == ServiceProvider.id
+    ).filter(ProviderSearch.provider_id.is_(None), ServiceProvider.approved.is_(True))
+    if provider_ids is not None:
+        query = query.filter(ServiceProvider.id.in_(provider_ids))
+    docs = [document(provider) for provider in query]
+    if skill:
+        key = skill.strip().lower()
+        docs = [doc for doc in docs if key in doc.skill_keys]
+    return docs
+
+
+def documents(session, provider_ids, skill=None):
+    if not provider_ids:
+        return {}
+    query = session.query(ProviderSearch).filter(ProviderSearch.provider_id.in_(provider_ids))
+    if skill:
+        query = query.filter(skill_filter(skill))
+    docs = {doc.provider_id: doc for doc in query}
+    missing = [provider_id for provider_id in provider_ids if provider_id not in docs]
+    if missing:
+        docs.update((doc.provider_id, doc) for doc in _undocumented(session, skill, missing))
+    return docs
+
+
+def all_documents(session, skill=None):
+    query = session.query(ProviderSearch)
+    if skill:
+        query = query.filter(skill_filter(skill))
+    docs = query.all() + _undocumented(session, skill)
+    return sorted(docs, key=lambda doc: doc.provider_id)
+
+
+def rebuild(session, batch_size=500):
+    # Also picks up edits made outside this app; run it on a schedule with
+    # `flask search-rebuild --interval`.
+    rebuilt = 0
+    last_id = 0
+    while True:
+        rows = session.query(ServiceProvider.id, ServiceProvider.skills).filter(
+            ServiceProvider.id > last_id
+        ).order_by(ServiceProvider.id).limit(batch_size).all()
+        if not rows:
+            break
+        connection = session.connection()
+        for provider_id, skills in rows:
+            refresh(connection, provider_id, skills)
+        session.commit()
+        rebuilt += len(rows)
+        last_id = rows[-1].id
+    return rebuilt
+
+
+@event.listens_for(ServiceProvider, 'after_insert')
+@event.listens_for(ServiceProvider, 'after_update')
+def _refresh_document(mapper, connection, target):
+    refresh(connection, target.id, target.skills)
+
+
+@event.listens_for(ServiceProvider, 'before_delete')
+def _drop_document(mapper, connection, target):
+    connection.execute(delete(ProviderSearch).where(ProviderSearch.provider_id == target.id))
@@ -0,0 +1,64 @@
+    const locationStatus = document.getElementById('locationStatus');
+    const locationError = document.getElementById('locationError');
+    const spinner = document.getElementById('spinner');
+    const landingForm = document.getElementById('landingForm');
+    const nextButton = document.getElementById('nextButton');
+    const gadgetSelect = document.getElementById('gadgetSelect');
+
+    let userLatitude = null;
+    let userLongitude = null;
+
+    
+    gadgetSelect.addEventListener('change', () => {
+      nextButton.disabled = !gadgetSelect.value;
+    });
+
+    function success(position) {
+      userLatitude = position.coords.latitude;
+      userLongitude = position.coords.longitude;
+
+      locationStatus.textContent = "Location fetched successfully!";
+      spinner.style.display = 'none';
+
+      landingForm.style.display = 'block';
+    }
+
+    function error(err) {
+      spinner.style.display = 'none';
+      locationStatus.style.display = 'none';
+      locationError.style.display = 'block';
+
+      switch(err.code) {
+        case err.PERMISSION_DENIED:
+          locationError.textContent = "Location permission denied. Please allow location access to find nearby providers.";
+          break;
+        case err.POSITION_UNAVAILABLE:
+          locationError.textContent = "Location information is unavailable.";
+          break;
+        case err.TIMEOUT:
+          locationError.textContent = "Location request timed out. Please try again.";
+          break;
+        default:
+          locationError.textContent = "An unknown error occurred while fetching location.";
+          break;
+      }
+    }
+
+    window.onload = () => {
+      if (!navigator.geolocation) {
+        locationStatus.textContent = "Geolocation is not supported by your browser.";
+        spinner.style.display = 'none';
+      } else {
+        navigator.geolocation.getCurrentPosition(success, error, {timeout: 10000});
+      }
+    };
+
+    landingForm.addEventListener('submit', (e) => {
+      e.preventDefault();
+
+      if (!gadgetSelect.value) return;
+
+      const url = `/login?lat=${encodeURIComponent(userLatitude)}&lon=${encodeURIComponent(userLongitude)}&gadget=${encodeURIComponent(gadgetSelect.value)}`;
+      window.location.href = url;
+    });
+  
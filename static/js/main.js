@@ -0,0 +1,67 @@
+  function renderStars(container, avg) {
+    container.innerHTML = ''; 
+    if (avg === null || avg === undefined || avg === 0) {
+      container.textContent = 'No ratings yet';
+      return;
+    }
+
+    const fullStars = Math.floor(avg);
+    const halfStar = avg - fullStars >= 0.5;
+    const totalStars = 5;
+
+    for (let i = 0; i < fullStars; i++) {
+      container.innerHTML += '<span class="star">&#9733;</span>'; 
+    }
+
+    if (halfStar) {
+      container.innerHTML += '<span class="star">&#x272E;</span>'; 
+    }
+
+    const emptyStars = totalStars - fullStars - (halfStar ? 1 : 0);
+    for (let i = 0; i < emptyStars; i++) {
+      container.innerHTML += '<span class="star">&#9734;</span>';
+    }
+
+    container.innerHTML += ` <span style="margin-left: 8px; font-weight: bold;">(${avg.toFixed(1)})</span>`;
+  }
+
+  function loadProviderRatings(containers) {
+    const ids = containers.map(container => container.id.split('provider-rating-')[1]);
+
+    fetch(`/providers/average_ratings?ids=${ids.join(',')}`)
+      .then(res => {
+        if (!res.ok) throw new Error('Network response was not ok');
+        return res.json();
+      })
+      .then(data => {
+        containers.forEach((container, i) => {
+          renderStars(container, data.ratings[ids[i]]);
+        });
+      })
+      .catch(err => {
+        console.error('Failed to load provider ratings:', err);
+        containers.forEach(container => {
+          container.textContent = 'Rating unavailable';
+        });
+      });
+  }
+
+  function loadAllProviderRatings() {
+    const ratingContainers = document.querySelectorAll('[id^="provider-rating-"]');
+    const missing = [];
+    ratingContainers.forEach(container => {
+      if (container.dataset.rating !== undefined) {
+        renderStars(container, parseFloat(container.dataset.rating));
+      } else if (container.id.split('provider-rating-')[1]) {
+        missing.push(container);
+      }
+    });
+
+    if (missing.length) {
+      loadProviderRatings(missing);
+    }
+  }
+
+  document.addEventListener('DOMContentLoaded', () => {
+    loadAllProviderRatings();
+  });
@@ -0,0 +1,41 @@
+  const bookingBtn = document.querySelector('.btn-book');
+  const modal = document.getElementById('bookingModal');
+  const closeModalBtn = document.getElementById('closeModal');
+
+  bookingBtn.addEventListener('click', () => {
+    modal.classList.add('active');
+    setMinDates();
+  });
+
+  closeModalBtn.addEventListener('click', () => {
+    modal.classList.remove('active');
+  });
+
+  modal.addEventListener('click', e => {
+    if (e.target === modal) {
+      modal.classList.remove('active');
+    }
+  });
+
+  function setMinDates() {
+    const now = new Date();
+    const y = now.getFullYear();
+    const m = String(now.getMonth() + 1).padStart(2, '0');
+    const d = String(now.getDate()).padStart(2, '0');
+    const h = String(now.getHours()).padStart(2, '0');
+    const min = String(now.getMinutes()).padStart(2, '0');
+
+    document.getElementById('purchaseDate').max = `${y}-${m}-${d}`;
+    document.getElementById('preferredTime').min = `${y}-${m}-${d}T${h}:${min}`;
+  }
+
+  function openLightbox(src) {
+    const lightbox = document.getElementById('lightbox');
+    const img = document.getElementById('lightboxImg');
+    img.src = src;
+    lightbox.style.display = 'flex';
+  }
+
+  function closeLightbox() {
+    document.getElementById('lightbox').style.display = 'none';
+  }
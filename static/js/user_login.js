@@ -0,0 +1,120 @@
+    const spinner = document.getElementById("spinner");
+      const overlay = document.getElementById("overlay");
+    const checkEmailBtn = document.getElementById('checkEmailBtn');
+    const emailInput = document.getElementById('emailInput');
+    const otpSection = document.getElementById('otpSection');
+    const errorMessage = document.getElementById('errorMessage');
+    const emailLoginForm = document.getElementById('emailLoginForm');
+
+    let currentEmail = null;
+
+    function showLoader() {
+        spinner.style.display = "block";
+        overlay.style.display = "block";
+      }
+
+      function hideLoader() {
+        spinner.style.display = "none";
+        overlay.style.display = "none";
+      }
+
+    checkEmailBtn.addEventListener('click', async () => {
+      const email = emailInput.value.trim();
+      if (!email) {
+        showError('Please enter your email.');
+        return;
+      }
+      clearError();
+      const urlParams = new URLSearchParams(window.location.search);
+      const latitude = urlParams.get('lat'); 
+      const longitude = urlParams.get('lon');
+      console.log(longitude, latitude)
+      const gadget = urlParams.get('gadget') || '';
+      showLoader();
+
+      try {
+        const res = await fetch('/check_email2', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ email })
+        });
+        const data = await res.json();
+        console.log(data);
+
+        if (data.error) {
+          showError(data.error);
+        } else if (data.exists) {
+          currentEmail = email;
+          showOtpSection();
+        } else {
+          showError('Email not registered. Please sign up first.');
+          window.location.href = `/signup?gadget=${encodeURIComponent(gadget)}`;
+        }
+
+      } catch (err) {
+        showError('Something went wrong. Please try again.');
+      } finally{
+        hideLoader();
+      }
+    });
+
+    emailLoginForm.addEventListener('submit', async (e) => {
+      e.preventDefault();
+      if (!currentEmail) {
+        showError('Please verify your email first.');
+        return;
+      }
+
+      const otp = document.getElementById('otpInput').value.trim();
+
+      if (!otp || otp.length !== 6) {
+        showError('Enter a valid 6-digit OTP.');
+        return;
+      }
+
+      clearError();
+      const urlParams = new URLSearchParams(window.location.search);
+      const latitude = urlParams.get('lat'); 
+      const longitude = urlParams.get('lon');
+      const gadget = urlParams.get('gadget') || '';
+
+      try {
+        const res = await fetch('/verify_otp', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          credentials: 'include',
+          body: JSON.stringify({ email: currentEmail, otp, latitude, longitude })
+        });
+
+        const data = await res.json();
+        if (data.success) {
+          alert('Login successful!');
+          window.location.href = `/providers?gadget=${encodeURIComponent(gadget)}`;
+        } else {
+          showError('Incorrect OTP. Try again.');
+        }
+      } catch (err) {
+        showError('OTP verification failed.');
+      }
+    });
+
+    function showOtpSection() {
+      otpSection.style.display = 'block';
+      emailInput.disabled = true;
+      checkEmailBtn.disabled = true;
+    }
+
+    function showError(msg) {
+      errorMessage.textContent = msg;
+      errorMessage.style.display = 'block';
+    }
+
+    function clearError() {
+      errorMessage.textContent = '';
+      errorMessage.style.display = 'none';
+    }
+
+    function toggleLanguage() {
+      alert("Hindi version coming soon!");
+    }
+  
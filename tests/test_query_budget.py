@@ -0,0 +1,20 @@
+import pytest
+import loadtest
+from models import db
+
+
+@pytest.fixture
+def signed_in(app, client):
+    loadtest.seed(db.session, users=3, providers=10, appointments=30, coupons=5)
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['lat'] = str(loadtest.CENTER[0])
+        session['lon'] = str(loadtest.CENTER[1])
+    return client
+
+
+@pytest.mark.query_budget(3)
+def test_user_appointments_within_budget(signed_in, query_budget):
+    response = signed_in.get('/user/appointments')
+    assert response.status_code == 200
+    assert [endpoint for endpoint, _ in query_budget] == ['appointments.user_appointments']
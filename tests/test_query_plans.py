@@ -0,0 +1,18 @@
+import pytest
+import loadtest
+from indexes import check_query_plans, hot_queries
+from models import db
+
+
+@pytest.fixture
+def seeded(app):
+    loadtest.seed(db.session, users=3, providers=10, appointments=30, coupons=5)
+    db.session.commit()
+    return app
+
+
+@pytest.mark.parametrize('name', sorted(hot_queries()))
+def test_hot_query_uses_index(seeded, name):
+    lat, lng = loadtest.CENTER
+    uses_index, plan = check_query_plans(db.engine, lat=lat, lng=lng)[name]
+    assert uses_index, '\n'.join(plan)
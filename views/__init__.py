@@ -0,0 +1,16 @@
+from views.main import bp as main_bp
+from views.auth import bp as auth_bp
+from views.providers import bp as providers_bp
+from views.appointments import bp as appointments_bp
+from views.coupons import bp as coupons_bp
+from views.payments import bp as payments_bp
+from views.metrics import bp as metrics_bp
+from views.exports import bp as exports_bp
+from views.reports import bp as reports_bp
+from views.assets import bp as assets_bp
+
+
+def register_blueprints(app):
+    for bp in (main_bp, auth_bp, providers_bp, appointments_bp, coupons_bp, payments_bp, metrics_bp,
+               exports_bp, reports_bp, assets_bp):
+        app.register_blueprint(bp)
@@ -0,0 +1,170 @@
+from flask import Blueprint, request, abort, make_response, jsonify, send_file
+from flask_login import current_user, login_required
+from flask_socketio import join_room
+from database import read_only
+from models import db, Appointment
+from extensions import socketio, invoice_store
+from feed import GROUP_ORDER, change_token, grouped_page, status_page
+from events import emit_appointment_update
+from invoices import load_invoice_appointment, is_billable
+from ratings import record_rating
+from rollups import record as record_rollup
+
+
+bp = Blueprint('appointments', __name__)
+
+
+@bp.route('/user/appointments', methods=['GET'])
+@login_required
+@read_only
+def user_appointments():
+    status = request.args.get('status')
+    cursor = request.args.get('cursor', type=int)
+    limit = min(request.args.get('limit', 50, type=int), 200)
+
+    if status is not None and status not in GROUP_ORDER:
+        return jsonify({'error': 'Unknown status'}), 400
+
+    etag = change_token(db.session, current_user.id, status, cursor, limit)
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    elif status:
+        items, next_cursor = status_page(db.session, current_user.id, status, limit, cursor)
+        response = jsonify({'items': items, 'next_cursor': next_cursor})
+    else:
+        grouped, cursors = grouped_page(db.session, current_user.id, limit)
+        grouped['next_cursors'] = cursors
+        response = jsonify(grouped)
+
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+
+@bp.route('/appointments/<int:appointment_id>/review', methods=['POST'])
+@login_required
+def submit_review(appointment_id):
+    appointment = Appointment.query.filter_by(id=appointment_id, user_id=current_user.id).with_for_update().first()
+
+    if not appointment:
+        return jsonify({'error': 'Appointment not found'}), 404
+
+    if appointment.status != 'Completed':
+        return jsonify({'error': 'Only completed appointments can be reviewed'}), 400
+
+    data = request.get_json()
+    rating = data.get('rating')
+    comment = data.get('comment')
+
+    if not rating:
+        return jsonify({'error': 'Rating is required'}), 400
+
+    try:
+        rating = int(rating)
+        if rating < 1 or rating > 5:
+            raise ValueError()
+    except ValueError:
+        return jsonify({'error': 'Rating must be an integer between 1 and 5'}), 400
+
+    record_rating(db.session, appointment.provider_id, appointment.rating, rating)
+    appointment.rating = rating
+    appointment.comment = comment
+    db.session.commit()
+    emit_appointment_update(appointment, {"has_reviewed": True})
+
+    return jsonify({'message': 'Review submitted successfully'})
+
+
+@bp.route('/appointments/<int:appointment_id>/cancel', methods=['POST'])
+@login_required
+def cancel_appointment(appointment_id):
+    appointment = Appointment.query.filter_by(id=appointment_id, user_id=current_user.id).first()
+
+    if not appointment:
+        return jsonify({'error': 'Appointment not found'}), 404
+
+    if appointment.status not in ['New', 'Pending']:
+        return jsonify({'error': 'Cannot cancel this appointment'}), 400
+
+    appointment.status = 'Cancelled'
+    appointment.cancel_reason = 'Cancelled by user'
+    record_rollup(db.session, appointment.provider_id, cancellations=1)
+    db.session.commit()
+    emit_appointment_update(appointment, {"status": appointment.status, "cancel_reason": appointment.cancel_reason})
+
+    return jsonify({'message': 'Appointment cancelled'})
+
+
+@bp.route('/appointments/<int:appointment_id>/cancel_reschedule', methods=['POST'])
+@login_required
+def cancel_reschedule(appointment_id):
+    appointment = Appointment.query.filter_by(id=appointment_id, user_id=current_user.id).first()
+
+    if not appointment:
+        return jsonify({'error': 'Appointment not found'}), 404
+
+    if appointment.status != 'Rescheduled':
+        return jsonify({'error': 'Only rescheduled appointments can be cancelled'}), 400
+
+    appointment.status = 'Cancelled'
+    appointment.cancel_reason = 'Cancelled by user (reschedule)'
+    record_rollup(db.session, appointment.provider_id, cancellations=1)
+    db.session.commit()
+    emit_appointment_update(appointment, {"status": appointment.status, "cancel_reason": appointment.cancel_reason})
+
+    return jsonify({'message': 'Rescheduled appointment cancelled'})
+
+
+@bp.route('/appointments/<int:appointment_id>/accept_reschedule', methods=['POST'])
+@login_required
+def accept_reschedule(appointment_id):
+    appointment = Appointment.query.filter_by(id=appointment_id, user_id=current_user.id).first()
+
+    if not appointment:
+        return jsonify({'error': 'Appointment not found'}), 404
+
+    if appointment.status != 'Rescheduled':
+        return jsonify({'error': 'Only rescheduled appointments can be accepted'}), 400
+
+    if not appointment.reschedule_time:
+        return jsonify({'error': 'Reschedule time is not set'}), 400
+
+    appointment.status = 'Pending_Rescheduled'
+    db.session.commit()
+    emit_appointment_update(appointment, {"status": appointment.status})
+
+    return jsonify({'message': 'Rescheduled appointment accepted and moved to pending'})
+
+
+@bp.route('/download_bill/<int:appointment_id>')
+@login_required
+def download_bill(appointment_id):
+    appointment = load_invoice_appointment(appointment_id)
+    if not appointment:
+        abort(404)
+
+    if appointment.user_id != current_user.id or not is_billable(appointment):
+        return "Bill not available.", 403
+
+    digest, path = invoice_store.get_or_create(appointment)
+    response = send_file(
+        path,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=f'bill_{appointment.id}.pdf',
+        etag=digest,
+        conditional=True
+    )
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+@socketio.on('join_room')
+def handle_join(data):
+    user_id = data.get('user_id')
+    join_room(f"user_{user_id}")
+    if current_user.is_authenticated:
+        join_room(f"appointments_{current_user.id}")
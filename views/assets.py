@@ -0,0 +1,20 @@
+from flask import Blueprint, abort, request, send_from_directory
+from extensions import assets
+from assets import MANIFEST, MAX_AGE
+
+
+bp = Blueprint('assets', __name__)
+
+
+@bp.route('/static/dist/<path:filename>')
+def fingerprinted(filename):
+    if filename == MANIFEST or filename.endswith(('.br', '.gz')):
+        abort(404)
+    path, encoding, mimetype = assets.variant(filename, request.accept_encodings)
+    response = send_from_directory(assets.dist_dir, path, mimetype=mimetype, max_age=MAX_AGE)
+    if encoding:
+        response.content_encoding = encoding
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
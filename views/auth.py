@@ -0,0 +1,143 @@
+from flask import Blueprint, current_app, request, render_template, redirect, flash, url_for, jsonify, session
+from flask_login import current_user, login_required, login_user, logout_user
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
+from models import db, User
+from extensions import login_manager, user_cache, otp_store, mail_queue, identity_filter
+from accounts import uniqueness_conflict
+
+
+bp = Blueprint('auth', __name__)
+
+USER_CACHE_COLUMNS = [column.key for column in User.__table__.columns]
+
+
+@login_manager.unauthorized_handler
+def unauthorized():
+    if request.path.startswith('/user/') or request.is_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return redirect(url_for('auth.login', next=request.url))
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    values = user_cache.get(user_id)
+    if values is None:
+        user = db.session.get(User, user_id)
+        if user:
+            user_cache.set(user_id, {column: getattr(user, column) for column in USER_CACHE_COLUMNS})
+        return user
+
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def send_email(email, subject, body):
+    return mail_queue.send(email, subject, body)
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()  
+    session.clear()  
+    flash('You have been logged out.', 'info')
+    return redirect(url_for('main.landing'))
+
+@bp.route('/check_email2', methods=['POST'])
+def check_email2():
+    data = request.get_json()
+    email = data.get('email', '').lower()
+    config = current_app.config
+
+    if not identity_filter.might_have_email(email):
+        return jsonify({'exists': False})
+
+    user = User.query.filter_by(username=email).first()
+
+    if user:
+        # Only sends are throttled; probes that send nothing cost no mail.
+        if not otp_store.hit(f"email:{email}", config['OTP_EMAIL_LIMIT'], config['OTP_THROTTLE_WINDOW']):
+            return jsonify({'error': 'Too many OTP requests. Please try again later.'}), 429
+        if not otp_store.hit(f"ip:{request.remote_addr}", config['OTP_IP_LIMIT'], config['OTP_THROTTLE_WINDOW']):
+            return jsonify({'error': 'Too many requests. Please try again later.'}), 429
+
+        otp = otp_store.issue(email)
+        session['otp_email'] = email
+        subject = "OTP for E-Mail verification"
+        body = f"Your OTP for E-Mail verification is {otp}, valid only for 2 minutes. Do not share with anyone." 
+        send_email(email, subject, body) 
+        return jsonify({'exists': True})
+
+    return jsonify({'exists': False})
+
+
+
+@bp.route('/verify_otp', methods=['POST'])
+def verify_otp():
+    data = request.get_json()
+    email = data.get('email', '').lower()
+    otp_submitted = data.get('otp')
+    otp_email = session.get('otp_email')
+
+    if email == otp_email and otp_store.verify(email, otp_submitted):
+        user = User.query.filter_by(username=email).first()
+        if user:
+            login_user(user)
+            session.pop('otp_email')
+            user.latitude = session.get('lat')
+            user.longitude = session.get('lon')
+            db.session.commit()
+            user_cache.delete(user.id)
+            return jsonify({'success': True})
+        if not user:
+            flash('User not found. Please sign up.', 'warning')
+            return redirect(url_for('auth.signup', email=email))
+    return jsonify({'success': False})
+
+
+@bp.route('/login')
+def login():
+    gadget = request.args.get('gadget', '')
+    session['lat'] = request.args.get('lat')
+    session['lon'] = request.args.get('lon')
+    return redirect(url_for('auth.login_form', gadget=gadget))  
+
+
+
+@bp.route('/login_form', methods=['GET'])
+def login_form():
+    gadget = request.args.get('gadget', '')
+    if current_user.is_authenticated:
+        return redirect(url_for('providers.show_providers', gadget=gadget))
+    return render_template('user_login.html', )
+
+
+
+@bp.route('/signup', methods=['GET', 'POST'])
+def signup():
+    email_prefill = request.args.get('email', '').strip().lower()
+    gadget = request.args.get('gadget', '')
+
+    if request.method == 'POST':
+        email = request.form.get('email', '').strip().lower()
+        mobile = request.form.get('mobile_number', '').strip()
+
+        new_user = User(username=email, mobile_number=mobile)
+        db.session.add(new_user)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            if uniqueness_conflict(db.session, email, mobile) == 'mobile':
+                flash('Mobile Number is  already registered. Please login with your credentials.', 'warning')
+            else:
+                flash('EMAIL is  already registered. Please login with your credentials.', 'warning')
+            return redirect(url_for('auth.login', gadget = gadget))
+
+        flash('Account created now login to the portal.', 'success')
+        return redirect(url_for('auth.login', gadget = gadget))
+
+    return render_template('signup.html', email=email_prefill)
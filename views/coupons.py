@@ -0,0 +1,52 @@
+from flask import Blueprint, request, jsonify
+from flask_login import current_user, login_required
+from models import db, Coupon
+from coupons import redeem as redeem_coupon, user_coupons as list_user_coupons, coupon_state
+
+
+bp = Blueprint('coupons', __name__)
+
+
+@bp.route('/user/coupons', methods=['GET'])
+@login_required
+def my_coupons():
+    coupons = list_user_coupons(db.session, current_user.id)
+    return jsonify([{
+        "coupon_code": c.coupon_code,
+        "discount": c.discount,
+        "expiry_date": c.expiry_date.strftime("%Y-%m-%d")
+    } for c in coupons])
+
+
+@bp.route('/coupons/<code>', methods=['GET'])
+@login_required
+def validate_coupon(code):
+    coupon = Coupon.query.filter_by(coupon_code=code.upper(), user_id=current_user.id).first()
+    if not coupon:
+        return jsonify({'error': 'Coupon not found'}), 404
+
+    state = coupon_state(coupon)
+    return jsonify({
+        'coupon_code': coupon.coupon_code,
+        'discount': coupon.discount,
+        'expiry_date': coupon.expiry_date.strftime("%Y-%m-%d"),
+        'status': state,
+        'valid': state == 'unused'
+    })
+
+
+@bp.route('/coupons/redeem', methods=['POST'])
+@login_required
+def redeem_coupon_view():
+    data = request.get_json()
+    code = (data.get('coupon_code') or '').strip().upper()
+    if not code:
+        return jsonify({'error': 'Coupon code is required'}), 400
+
+    discount, result = redeem_coupon(db.session, code, current_user.id)
+    if result == 'not_found':
+        return jsonify({'error': 'Coupon not found'}), 404
+    if result != 'redeemed':
+        return jsonify({'error': f'Coupon is {result}'}), 409
+
+    return jsonify({'message': 'Coupon redeemed', 'discount': discount})
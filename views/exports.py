@@ -0,0 +1,47 @@
+import hmac
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from database import read_only
+from models import db
+from export import FORMATS, chunked, encode, iter_rows, parse_date
+
+
+bp = Blueprint('exports', __name__, url_prefix='/export')
+
+
+def token_authorized(config_key, header):
+    token = current_app.config[config_key]
+    supplied = request.headers.get(header, '')
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def export_authorized():
+    return token_authorized('EXPORT_TOKEN', 'X-Export-Token')
+
+
+@bp.route('/appointments')
+@read_only
+def export_appointments():
+    if not export_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(FORMATS)}"}), 400
+    try:
+        start = parse_date(request.args.get('start'))
+        end = parse_date(request.args.get('end'))
+    except ValueError:
+        return jsonify({"error": "start and end must look like 2024-01-31"}), 400
+
+    rows = iter_rows(
+        db.session,
+        start=start,
+        end=end,
+        statuses=request.args.getlist('status'),
+        after_id=request.args.get('after_id', 0, type=int),
+        batch_size=current_app.config['EXPORT_BATCH_SIZE']
+    )
+    body = chunked(encode(rows, fmt, header=not request.args.get('after_id')))
+    response = Response(stream_with_context(body), mimetype=FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename=appointments.{fmt}'
+    return response
@@ -0,0 +1,50 @@
+from flask import Blueprint, request, render_template, jsonify
+from flask_login import current_user, login_required
+from sqlalchemy.exc import IntegrityError
+from models import db
+from extensions import user_cache
+from accounts import uniqueness_conflict
+
+
+bp = Blueprint('main', __name__)
+
+
+@bp.route('/support')
+def support():
+    return render_template('support.html')
+
+@bp.route('/')
+def landing():
+    return render_template('landingPage.html')
+
+@bp.route('/landing_profile')
+def landing_profile():
+    return render_template('profile.html', user=current_user)
+
+
+@bp.route('/profile', methods=['GET', 'POST'])
+@login_required
+def profile():
+    if request.method == 'POST':
+        full_name = request.form.get('full_name', '').strip()
+        email = request.form.get('email', '').strip().lower()
+        phone = request.form.get('phone', '').strip()
+
+        if not full_name or not email or not phone:
+            return jsonify({'message': 'All fields are required.', 'category': 'warning'})
+
+        user_id = current_user.id
+        current_user.username = email
+        current_user.mobile_number = phone
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            if uniqueness_conflict(db.session, email, phone, exclude_id=user_id) == 'mobile':
+                return jsonify({'message': 'Mobile Number is already registered.', 'category': 'warning'})
+            return jsonify({'message': 'EMAIl is already registered.', 'category': 'warning'})
+
+        user_cache.delete(user_id)
+        return jsonify({'message': 'Profile updated successfully!', 'category': 'success'})
+
+    return render_template('profile.html', user=current_user)
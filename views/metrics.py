@@ -0,0 +1,44 @@
+from flask import Blueprint, jsonify
+from extensions import user_cache, coupon_pool, mail_queue, page_cache, identity_filter
+from instrumentation import sql_metrics
+from models import db
+from database import pool_metrics
+import media
+from views.exports import token_authorized
+
+
+bp = Blueprint('metrics', __name__, url_prefix='/metrics')
+
+
+@bp.before_request
+def metrics_authorized():
+    # Statement text and cache contents are internal; without a token the
+    # endpoints are closed.
+    if not token_authorized('METRICS_TOKEN', 'X-Metrics-Token'):
+        return jsonify({"error": "Unauthorized"}), 401
+
+
+@bp.route('/sql')
+def sql_metrics_view():
+    return jsonify(sql_metrics.snapshot())
+
+
+@bp.route('/cache')
+def cache_metrics():
+    return jsonify({
+        'users': user_cache.stats(),
+        'pages': page_cache.stats(),
+        'media_urls': media.stats(),
+        'identity_filter': identity_filter.stats(),
+        'coupon_pool': coupon_pool.stats()
+    })
+
+
+@bp.route('/mail')
+def mail_metrics():
+    return jsonify(mail_queue.metrics())
+
+
+@bp.route('/pool')
+def pool_metrics_view():
+    return jsonify(pool_metrics.snapshot(db.engines))
@@ -0,0 +1,187 @@
+import hmac, secrets
+from datetime import datetime, timedelta
+from flask import Blueprint, current_app, request, jsonify
+from sqlalchemy.exc import IntegrityError
+from models import db, Appointment, Coupon
+from extensions import coupon_pool
+from events import appointment_delta, outbox_handlers
+from outbox import enqueue as enqueue_event, dispatch as dispatch_outbox
+from rollups import record_payments
+
+
+bp = Blueprint('payments', __name__)
+
+
+def generate_discount_coupon(user_id, min_discount=5, max_discount=10):
+    code = coupon_pool.take()
+    discount = min_discount + secrets.randbelow(max_discount - min_discount + 1)
+    return code, discount
+
+
+def _int_field(item, name):
+    # Payment backends send ids as numbers or numeric strings; Query.get took both.
+    value = item.get(name)
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(name)
+    return int(value)
+
+
+def normalize_item(item):
+    if not isinstance(item, dict):
+        return None
+    try:
+        return dict(item, appointment_id=_int_field(item, "appointment_id"), user_id=_int_field(item, "user_id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def confirm_payment(item, appointments, confirmed_payments):
+    appointment_id = item.get("appointment_id")
+    payment_id = item.get("payment_id")
+
+    if payment_id and payment_id in confirmed_payments:
+        return {"appointment_id": confirmed_payments[payment_id], "status": "duplicate"}
+
+    appointment = appointments.get(appointment_id)
+    if not appointment:
+        return {"appointment_id": appointment_id, "status": "not_found"}
+
+    if appointment.payment_status:
+        if appointment.payment_id == payment_id:
+            return {"appointment_id": appointment_id, "status": "duplicate"}
+        return {"appointment_id": appointment_id, "status": "conflict"}
+
+    user_id = item.get("user_id") or appointment.user_id
+    appointment.payment_status = True
+    appointment.payment_id = payment_id
+    appointment.status = "Completed"
+
+    coupon_code, discount = generate_discount_coupon(user_id)
+    expiry_date = datetime.utcnow() + timedelta(days=30)
+
+    coupon = Coupon(
+        user_id=user_id,
+        appointment_id=appointment_id,
+        coupon_code=coupon_code,
+        expiry_date=expiry_date,
+        status="unused",
+        discount=discount
+    )
+    db.session.add(coupon)
+
+    if payment_id:
+        confirmed_payments[payment_id] = appointment_id
+
+    events = [
+        enqueue_event(db.session, 'socket', {
+            "event": 'appointment_updated',
+            "data": appointment_delta(appointment, {
+                "status": appointment.status,
+                "payment_status": True,
+                "has_reviewed": bool(appointment.rating or appointment.comment)
+            }),
+            "room": f"appointments_{appointment.user_id}"
+        }),
+        enqueue_event(db.session, 'socket', {
+            "event": 'payment_success_coupon',
+            "data": {
+                "coupon_code": coupon.coupon_code,
+                "expiry_date": expiry_date.strftime("%Y-%m-%d"),
+                "discount": coupon.discount
+            },
+            "room": f"user_{user_id}"
+        }),
+        enqueue_event(db.session, 'invoice', {"appointment_id": appointment_id}),
+    ]
+    return {"appointment_id": appointment_id, "status": "confirmed", "events": events}
+
+
+def confirm_payments(items):
+    normalized = [normalize_item(item) for item in items]
+    if any(item is None for item in normalized):
+        return [
+            {"appointment_id": item.get("appointment_id") if isinstance(item, dict) else None, "status": "invalid"}
+            if clean is None
+            else {"appointment_id": clean["appointment_id"], "status": "skipped"}
+            for item, clean in zip(items, normalized)
+        ]
+    items = normalized
+    appointment_ids = {item.get("appointment_id") for item in items}
+    payment_ids = {item.get("payment_id") for item in items if item.get("payment_id")}
+
+    confirmed_payments = {}
+    if payment_ids:
+        confirmed_payments = dict(db.session.query(Appointment.payment_id, Appointment.id).filter(
+            Appointment.payment_id.in_(payment_ids),
+            Appointment.payment_status.is_(True)
+        ).all())
+
+    appointments = {
+        a.id: a for a in Appointment.query.filter(Appointment.id.in_(appointment_ids)).with_for_update()
+    }
+
+    results = [confirm_payment(item, appointments, confirmed_payments) for item in items]
+    record_payments(db.session, [appointments[r["appointment_id"]] for r in results if r["status"] == "confirmed"])
+    try:
+        db.session.flush()
+        events = [(e.id, e.kind, e.payload) for result in results for e in result.pop("events", [])]
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return [{"appointment_id": item.get("appointment_id"), "status": "error"} for item in items]
+
+    dispatch_outbox(db.session, outbox_handlers, events, logger=current_app.logger)
+    return results
+
+
+def payment_backend_authorized(data):
+    secret = current_app.config['PAYMENT_BACKEND_SECRET']
+    supplied = data.get('provider_secret') if isinstance(data, dict) else None
+    if not secret or not isinstance(supplied, str):
+        return False
+    return hmac.compare_digest(supplied.encode(), secret.encode())
+
+
+@bp.route('/payment_confirm_user', methods=['POST'])
+def payment_confirm_user():
+    data = request.get_json()
+
+    if not payment_backend_authorized(data):
+        return jsonify({"error": "Unauthorized"}), 401
+
+    result = confirm_payments([data])[0]
+
+    if result["status"] == "invalid":
+        return jsonify({"error": "appointment_id and user_id must be integers"}), 400
+    if result["status"] == "not_found":
+        return jsonify({"error": "Appointment not found"}), 404
+    if result["status"] == "conflict":
+        return jsonify({"error": "Appointment already paid with a different payment"}), 409
+    if result["status"] == "error":
+        return jsonify({"error": "Payment could not be confirmed"}), 500
+    if result["status"] == "duplicate":
+        return jsonify({"message": "Payment already confirmed", "duplicate": True})
+
+    return jsonify({
+        "message": "Payment confirmed and coupon sent via socket"
+    })
+
+
+@bp.route('/payment_confirm_user/batch', methods=['POST'])
+def payment_confirm_batch():
+    data = request.get_json()
+
+    if not payment_backend_authorized(data):
+        return jsonify({"error": "Unauthorized"}), 401
+
+    payments = data.get("payments") or []
+    batch_size = current_app.config['PAYMENT_BATCH_SIZE']
+    if len(payments) > batch_size:
+        return jsonify({"error": f"At most {batch_size} payments per batch"}), 400
+
+    results = confirm_payments(payments)
+    if any(result["status"] == "invalid" for result in results):
+        return jsonify({"error": "appointment_id and user_id must be integers", "results": results}), 400
+    return jsonify({"results": results})
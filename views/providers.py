@@ -0,0 +1,174 @@
+from datetime import datetime
+from flask import Blueprint, current_app, request, render_template, abort, redirect, flash, url_for, jsonify, session
+from flask_login import current_user, login_required
+from database import read_only
+from models import db, ServiceProvider, Appointment
+from availability import availability, gadget_types
+from geo import nearby_providers
+from ratings import average_ratings
+from rollups import record as record_rollup
+from search import documents as search_documents, all_documents as all_search_documents
+from feed import serialize as serialize_appointment
+from events import emit_appointment_update
+from media import PRESETS, media_url, resolve_all as resolve_media
+from extensions import page_cache
+
+
+bp = Blueprint('providers', __name__)
+
+
+def _provider_item(doc, distance):
+    return {
+        "id": doc.provider_id,
+        "name": doc.name,
+        "skills": doc.skills,
+        "address": doc.address,
+        "distance": distance,
+        "average_rating": doc.average_rating
+    }
+
+
+def _nearby_providers(user_lat, user_lng, radius, gadget):
+    nearby = nearby_providers(db.session, user_lat, user_lng, radius, use_index=current_app.config['GEO_INDEX'])
+    docs = search_documents(db.session, [provider_id for provider_id, _ in nearby], skill=gadget)
+    return [_provider_item(docs[provider_id], distance) for provider_id, distance in nearby if provider_id in docs]
+
+
+def _all_providers(gadget):
+    return [_provider_item(doc, None) for doc in all_search_documents(db.session, skill=gadget)]
+
+
+@bp.route('/providers', methods=['GET'])
+@read_only
+def show_providers():
+    user_lat = session.get('lat')
+    user_lng = session.get('lon')
+    radius = request.args.get('radius', 20, type=float) 
+    gadget = request.args.get('gadget', '').strip()
+
+    def render(lat, lng, radius):
+        if lat is None:
+            providers = _all_providers(gadget)
+        else:
+            providers = _nearby_providers(lat, lng, radius, gadget)
+        return render_template('main.html', providers=providers, gadget=gadget)
+
+    if user_lat is not None and user_lng is not None:
+        return page_cache.listing(float(user_lat), float(user_lng), radius, [gadget.lower()], render)
+    return page_cache.listing(None, None, radius, [gadget.lower()], render)
+
+
+@bp.route('/provider/<int:provider_id>')
+@read_only
+def provider_profile(provider_id):
+    gadget = request.args.get('gadget', '')
+
+    def render():
+        provider = db.session.get(ServiceProvider, provider_id)
+        if not provider:
+            abort(404)
+        images = [work.image_path for work in provider.works]
+        return render_template(
+            'providr_profile.html',
+            provider=provider,
+            gadget_type=gadget,
+            thumbnails=resolve_media(images, current_app.config['MEDIA_GALLERY_PRESET']),
+            originals=resolve_media(images, 'original')
+        )
+
+    return page_cache.provider(provider_id, gadget, render)
+
+
+@bp.route('/uploads/<path:filename>')
+def uploaded_file(filename):
+    preset = request.args.get('preset') or None
+    if preset not in PRESETS:
+        abort(404)
+    response = redirect(media_url(filename, preset))
+    response.cache_control.public = True
+    response.cache_control.max_age = 86400
+    return response
+
+
+@bp.route('/provider/<int:provider_id>', methods=['GET', 'POST'])
+@login_required
+def provider_profile1(provider_id):
+    provider = ServiceProvider.query.get_or_404(provider_id)
+    gadget = request.args.get('gadget', '').lower()
+   
+    
+    if request.method == 'POST':
+        purchase_date = request.form.get('purchase_date')
+        problem_description = request.form.get('problem_description')
+        preferred_time = request.form.get('preferred_time')
+        gadget_type_name = request.form.get('gadget_type') or gadget
+        gadget_type_id = gadget_types.get(db.session, gadget_type_name)
+
+        if not gadget_type_id:
+            flash('Invalid gadget type selected.', 'danger')
+            return redirect(request.url)
+
+        preferred_time = datetime.strptime(preferred_time, '%Y-%m-%dT%H:%M')
+        availability.lock_provider(db.session, provider.id)
+        if availability.conflicts(db.session, provider.id, preferred_time):
+            db.session.rollback()
+            flash('This time slot is already booked. Please choose another time.', 'danger')
+            return redirect(request.url)
+
+        appointment = Appointment(
+            user_id=current_user.id,
+            provider_id=provider.id,
+            gadget_type_id=gadget_type_id,
+            purchase_date=datetime.strptime(purchase_date, '%Y-%m-%d'),
+            problem_description=problem_description,
+            preferred_time=preferred_time,
+            status='New'
+        )
+
+        db.session.add(appointment)
+        record_rollup(db.session, provider.id, bookings=1)
+        db.session.commit()
+        emit_appointment_update(appointment, serialize_appointment(appointment))
+        flash('Appointment booked successfully!', 'success')
+        return redirect(url_for('providers.show_providers', gadget=gadget))
+
+    return redirect(url_for('providers.show_providers', provider=provider, gadget=gadget))
+
+
+@bp.route('/provider/<int:provider_id>/availability')
+@read_only
+def provider_availability(provider_id):
+    at = request.args.get('at')
+    if at:
+        try:
+            start = datetime.strptime(at, '%Y-%m-%dT%H:%M')
+        except ValueError:
+            return jsonify({'error': 'at must look like 2024-01-31T14:00'}), 400
+        return jsonify({'at': at, 'free': availability.is_free(db.session, provider_id, start)})
+
+    count = min(request.args.get('count', 5, type=int), 50)
+    slots = availability.next_free(db.session, provider_id, count=count)
+    return jsonify({'slots': [slot.strftime('%Y-%m-%dT%H:%M') for slot in slots]})
+
+
+@bp.route('/provider/<int:provider_id>/average_rating')
+@read_only
+def get_average_rating(provider_id):
+    avg_rating = average_ratings(db.session, [provider_id])[provider_id]
+    return jsonify({'average_rating': avg_rating})
+
+
+@bp.route('/providers/average_ratings')
+@read_only
+def get_average_ratings():
+    ids = request.args.get('ids', '')
+    try:
+        provider_ids = {int(i) for i in ids.split(',') if i.strip()}
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma separated list of integers'}), 400
+
+    if len(provider_ids) > 200:
+        return jsonify({'error': 'Too many provider ids'}), 400
+
+    ratings = average_ratings(db.session, provider_ids)
+    return jsonify({'ratings': {str(k): v for k, v in ratings.items()}})
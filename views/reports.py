@@ -0,0 +1,26 @@
+from flask import Blueprint, request, jsonify
+from database import read_only
+from models import db
+from export import parse_date
+from rollups import PLATFORM, daily, summarize
+from views.exports import export_authorized
+
+
+bp = Blueprint('reports', __name__, url_prefix='/reports')
+
+
+@bp.route('/daily')
+@read_only
+def daily_report():
+    if not export_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
+
+    try:
+        start = parse_date(request.args.get('start'))
+        end = parse_date(request.args.get('end'))
+    except ValueError:
+        return jsonify({"error": "start and end must look like 2024-01-31"}), 400
+
+    provider_id = request.args.get('provider_id', PLATFORM, type=int)
+    days = daily(db.session, provider_id, start and start.date(), end and end.date())
+    return jsonify({"provider_id": provider_id, "summary": summarize(days), "days": days})